@@ -0,0 +1,104 @@
+"""Per-request cost of the default middleware stack, session and
+token authentication, with `WSGIRequest` and with the request class
+it replaces, which did not cache the host nor the domain.
+
+    python benchmarks/request_properties.py
+
+Each request carries a session cookie and a token cookie. The session
+cookie is sent back on each response: the domain is read once, and
+caching it does not show in this stack (both run at ~56 µs per
+request on CPython 3.11). The slots pay off when the host, domain or
+accept header are read several times, by the application itself.
+"""
+import timeit
+from horseman.environ import WSGIEnvironWrapper
+from http_session.meta import Store
+from knappe.auth import SignedTokenAuthenticator
+from knappe.fixtures.auth import DictSource, UserObject
+from knappe.middlewares import HTTPSession, Authentication
+from knappe.pipeline import Pipeline
+from knappe.request import WSGIRequest
+from knappe.response import Response
+from knappe.types import Request
+
+
+class BaselineRequest(Request, WSGIEnvironWrapper):
+
+    __slots__ = ('app', 'context')
+
+    def __init__(self, environ, app=None, context=None):
+        WSGIEnvironWrapper.__init__(self, environ)
+        self.app = app
+        self.context = context if context is not None else {}
+
+
+class MemoryStore(Store):
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, sid):
+        return self.data.get(sid)
+
+    def set(self, sid, session):
+        self.data[sid] = session
+
+    def clear(self, sid):
+        self.data.pop(sid, None)
+
+    def delete(self, sid):
+        self.data.pop(sid, None)
+
+
+ENVIRON = {
+    'REQUEST_METHOD': 'GET',
+    'SCRIPT_NAME': '/app',
+    'PATH_INFO': '/articles/2023/knappe',
+    'QUERY_STRING': 'page=2&sort=date&tag=wsgi',
+    'SERVER_NAME': 'example.com',
+    'SERVER_PORT': '443',
+    'HTTP_HOST': 'example.com:443',
+    'wsgi.url_scheme': 'https',
+}
+
+
+def handler(request):
+    session = request.context['http_session']
+    session['visits'] = session.get('visits', 0) + 1
+    return Response.html(body='<p>Hello</p>')
+
+
+def application():
+    authenticator = SignedTokenAuthenticator(
+        [DictSource({'admin': 'admin'})], secret='secret')
+    pipeline = Pipeline([
+        HTTPSession(store=MemoryStore(), secret='secret'),
+        Authentication(authenticator),
+    ])
+    wrapped = pipeline.wrap(handler)
+
+    # A first request opens the session.
+    response = wrapped(WSGIRequest(dict(ENVIRON)))
+    sid = response.cookies['sid'].split(';', 1)[0]
+    token = authenticator.issue(UserObject('admin'))
+    environ = {**ENVIRON, 'HTTP_COOKIE': f'{sid}; auth_token={token}'}
+    return wrapped, environ
+
+
+def run(factory, number: int) -> float:
+    wrapped, environ = application()
+    return min(timeit.repeat(
+        lambda: wrapped(factory(environ)), number=number, repeat=5)) / number
+
+
+def main(number: int = 20000):
+    baseline = run(BaselineRequest, number)
+    cached = run(WSGIRequest, number)
+    print(f'Baseline request: {baseline * 1e6:8.2f} µs per request')
+    print(f'WSGIRequest:      {cached * 1e6:8.2f} µs per request')
+    print(f'Difference:       {(baseline - cached) * 1e6:8.2f} µs '
+          f'({(1 - cached / baseline) * 100:.1f}%)')
+
+
+if __name__ == '__main__':
+    main()
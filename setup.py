@@ -5,12 +5,13 @@ setup(
     name='knappe',
     install_requires=[
         "autoroutes",
+        "biscuits",
         "chameleon",
         "horseman >= 1.0a1",
         "http_session",
         "inspect_mate",
         "itsdangerous",
-        "orjson",
+        "orjson >= 3.9.16",
         "prejudice",
         "transaction",
         "wrapt",
@@ -1,14 +1,25 @@
 import abc
+import time
+import logging
+import itsdangerous
 import typing as t
+from biscuits import Cookie
+from datetime import datetime, timedelta
+from concurrent.futures import Executor, TimeoutError
+from http_session.cookie import SameSite
 from knappe.types import RqT, User, UserId
 from knappe.request import WSGIRequest
 
 
 Credentials = t.TypeVar('Credentials')
+Logger = logging.getLogger(__name__)
 
 
 class Source(t.Generic[RqT, Credentials], abc.ABC):
 
+    # Maximum time, in seconds, a concurrent lookup waits for this source.
+    timeout: t.Optional[float] = None
+
     @abc.abstractmethod
     def find(self,
              credentials: Credentials, request: RqT) -> t.Optional[User]:
@@ -18,22 +29,144 @@ class Source(t.Generic[RqT, Credentials], abc.ABC):
     def fetch(self, uid: UserId, request: RqT) -> t.Optional[User]:
         pass
 
+    def fetch_many(self, uids: t.Iterable[UserId], request: RqT
+                   ) -> t.Mapping[UserId, User]:
+        """Fetch several users at once. Unknown ids are left out.
+        Sources able to batch their lookups should override this.
+        """
+        found = {}
+        for uid in uids:
+            if (user := self.fetch(uid, request)) is not None:
+                found[uid] = user
+        return found
+
+
+def concurrent_find(executor: Executor,
+                    sources: t.Iterable[Source[RqT, Credentials]],
+                    credentials: Credentials,
+                    request: RqT) -> t.Optional[User]:
+    """Query all the sources at once, in the given executor.
+    Results are consumed in the sources order: the first matching
+    source wins and the pending lookups of the lesser sources are
+    cancelled. A source exceeding its timeout counts as a miss.
+    """
+    start = time.monotonic()
+    futures = [
+        (source, executor.submit(source.find, credentials, request))
+        for source in sources
+    ]
+    try:
+        for source, future in futures:
+            timeout = None
+            if source.timeout is not None:
+                timeout = max(0, start + source.timeout - time.monotonic())
+            try:
+                user = future.result(timeout=timeout)
+            except TimeoutError:
+                Logger.warning(
+                    f'{source!r} timed out after {source.timeout}s.')
+                continue
+            if user is not None:
+                return user
+        return None
+    finally:
+        for _, future in futures:
+            future.cancel()
+
+
+class UserLoader(t.Generic[RqT]):
+    """Request-scoped batching users loader.
+    Ids are queued and resolved together, with one `fetch_many`
+    call per source, the first time one of them is accessed.
+    """
+
+    def __init__(self, authenticator: 'Authenticator', request: RqT):
+        self.authenticator = authenticator
+        self.request = request
+        self.pending: t.Set[UserId] = set()
+        self.resolved: t.Dict[UserId, t.Optional[User]] = {}
+
+    def queue(self, *uids: UserId):
+        for uid in uids:
+            if uid not in self.resolved:
+                self.pending.add(uid)
+        return self  # for chaining
+
+    def resolve(self):
+        if self.pending:
+            found = self.authenticator.fetch_many(self.request, self.pending)
+            for uid in self.pending:
+                self.resolved[uid] = found.get(uid)
+            self.pending.clear()
+
+    def get(self, uid: UserId) -> t.Optional[User]:
+        if uid not in self.resolved:
+            self.queue(uid).resolve()
+        return self.resolved[uid]
+
+    def get_many(self, uids: t.Iterable[UserId]
+                 ) -> t.Mapping[UserId, t.Optional[User]]:
+        uids = tuple(uids)
+        self.queue(*uids).resolve()
+        return {uid: self.resolved[uid] for uid in uids}
+
+    __getitem__ = get
+
 
 class Authenticator(t.Generic[RqT, Credentials], abc.ABC):
 
     sources: t.Iterable[Source[RqT, Credentials]]
+    executor: t.Optional[Executor] = None
+    loader_key: str = 'user_loader'
 
-    def __init__(self, sources: t.Iterable[Source[RqT, Credentials]]):
+    def __init__(self,
+                 sources: t.Iterable[Source[RqT, Credentials]],
+                 executor: t.Optional[Executor] = None):
         self.sources = sources
+        self.executor = executor
 
     def from_credentials(self, request: RqT, credentials: Credentials
                          ) -> t.Optional[User]:
+        if self.executor is not None:
+            return concurrent_find(
+                self.executor, self.sources, credentials, request)
         for source in self.sources:
             user = source.find(credentials, request)
             if user is not None:
                 return user
         return None
 
+    def fetch_many(self, request: RqT, uids: t.Iterable[UserId]
+                   ) -> t.Mapping[UserId, User]:
+        found = {}
+        missing = set(uids)
+        for source in self.sources:
+            if not missing:
+                break
+            users = source.fetch_many(missing, request)
+            found.update(users)
+            missing = missing - users.keys()
+        return found
+
+    def loader(self, request: RqT) -> UserLoader[RqT]:
+        if (loader := request.context.get(self.loader_key)) is None:
+            loader = request.context[self.loader_key] = UserLoader(
+                self, request)
+        return loader
+
+    def fetch(self, request: RqT, uid: UserId) -> t.Optional[User]:
+        for source in self.sources:
+            user = source.fetch(uid, request)
+            if user is not None:
+                return user
+        return None
+
+    def finalize(self, request: RqT, response):
+        """Called by the authentication middleware with the response.
+        Authenticators keeping their state client-side write it here.
+        """
+        return response
+
     @abc.abstractmethod
     def identify(self, request: RqT) -> t.Optional[User]:
         pass
@@ -54,10 +187,12 @@ class WSGISessionAuthenticator(
 
     def __init__(self, sources,
                  context_key: str = 'user',
-                 session_key: str = 'user'):
+                 session_key: str = 'user',
+                 executor: t.Optional[Executor] = None):
         self.context_key = context_key
         self.session_key = session_key
         self.sources = sources
+        self.executor = executor
 
     def identify(self, request: WSGIRequest) -> t.Optional[User]:
         if (user := request.context.get(self.context_key)) is not None:
@@ -66,11 +201,9 @@ class WSGISessionAuthenticator(
         if (session := request.context.get('http_session')) is not None:
             userid: UserId
             if (userid := session.get(self.session_key, None)) is not None:
-                for source in self.sources:
-                    user = source.fetch(userid, request)
-                    if user is not None:
-                        request.context[self.context_key] = user
-                        return user
+                if (user := self.fetch(request, userid)) is not None:
+                    request.context[self.context_key] = user
+                    return user
 
         return None
 
@@ -83,3 +216,152 @@ class WSGISessionAuthenticator(
         if (session := request.context.get('http_session')) is not None:
             session[self.session_key] = user.id
         request.context[self.context_key] = user
+
+
+class TokenUser(User):
+
+    def __init__(self, userid: UserId, claims: t.Mapping[str, t.Any]):
+        self.id = userid
+        self.claims = claims
+
+
+class SignedTokenAuthenticator(
+        Authenticator[WSGIRequest, t.Mapping | str | bytes]):
+    """Stateless authenticator: the user id and a few claims are kept
+    in a signed and expiring token, sent as a cookie or as a bearer
+    `Authorization` header. Identifying the user is a signature check,
+    without session or sources lookups, unless `revalidate` is set:
+    tokens older than `revalidate` seconds are then checked against
+    the sources and issued anew. A renewed token is sent back the way
+    it came: as a cookie, or in the `renew_header` response header for
+    bearer tokens, as API clients do not send cookies back.
+    User ids and claims must be JSON serializable.
+    """
+
+    sources: t.Iterable[Source[WSGIRequest, t.Mapping | str | bytes]]
+
+    def __init__(self, sources,
+                 secret: str,
+                 salt: str = 'knappe.auth.token',
+                 TTL: int = 3600,
+                 revalidate: t.Optional[int] = None,
+                 claims: t.Optional[
+                     t.Callable[[User], t.Mapping[str, t.Any]]] = None,
+                 user_factory: t.Callable[
+                     [UserId, t.Mapping[str, t.Any]], User] = TokenUser,
+                 cookie_name: t.Optional[str] = 'auth_token',
+                 bearer: bool = True,
+                 renew_header: str = 'X-Auth-Token',
+                 secure: bool = True,
+                 samesite: SameSite = SameSite.lax,
+                 httponly: bool = True,
+                 context_key: str = 'user',
+                 token_key: str = 'auth_token',
+                 executor: t.Optional[Executor] = None):
+        self.sources = sources
+        self.serializer = itsdangerous.URLSafeTimedSerializer(
+            secret, salt=salt)
+        self.TTL = TTL
+        self.revalidate = revalidate
+        self.claims = claims
+        self.user_factory = user_factory
+        self.cookie_name = cookie_name
+        self.bearer = bearer
+        self.renew_header = renew_header
+        self.secure = secure
+        self.samesite = SameSite(samesite)
+        self.httponly = httponly
+        self.context_key = context_key
+        self.token_key = token_key
+        self.origin_key = f'{token_key}_origin'
+        self.executor = executor
+
+    def issue(self, user: User) -> str:
+        return self.serializer.dumps({
+            'uid': user.id,
+            'claims': self.claims(user) if self.claims is not None else {}
+        })
+
+    def find_token(self, request: WSGIRequest
+                   ) -> t.Tuple[t.Optional[str], t.Optional[str]]:
+        """Returns the token and where it was found:
+        'cookie' or 'bearer'.
+        """
+        if self.cookie_name is not None and request.cookies and (
+                token := request.cookies.get(self.cookie_name)):
+            return token, 'cookie'
+        if self.bearer and (
+                header := request.get('HTTP_AUTHORIZATION')):
+            scheme, _, token = header.partition(' ')
+            if scheme.lower() == 'bearer' and token:
+                return token.strip(), 'bearer'
+        return None, None
+
+    def read_token(self, request: WSGIRequest) -> t.Optional[str]:
+        return self.find_token(request)[0]
+
+    def identify(self, request: WSGIRequest) -> t.Optional[User]:
+        if (user := request.context.get(self.context_key)) is not None:
+            return user
+
+        token, origin = self.find_token(request)
+        if token is None:
+            return None
+
+        try:
+            payload, issued = self.serializer.loads(
+                token, max_age=self.TTL, return_timestamp=True)
+        except itsdangerous.BadSignature:
+            # Tampered or expired token.
+            return None
+
+        request.context[self.origin_key] = origin
+        uid = payload['uid']
+        if self.revalidate is not None and (
+                time.time() - issued.timestamp() >= self.revalidate):
+            user = self.fetch(request, uid)
+            if user is None:
+                self.forget(request)
+                return None
+            self.remember(request, user)
+        else:
+            user = self.user_factory(uid, payload.get('claims', {}))
+            request.context[self.context_key] = user
+        return user
+
+    def forget(self, request: WSGIRequest):
+        request.context[self.token_key] = ''
+        request.context[self.context_key] = None
+
+    def remember(self, request: WSGIRequest, user: User):
+        request.context[self.token_key] = self.issue(user)
+        request.context[self.context_key] = user
+
+    def cookie(self, request: WSGIRequest, token: str) -> str:
+        if token:
+            expires = datetime.now() + timedelta(seconds=self.TTL)
+        else:
+            # Forgotten: the client is asked to drop the cookie.
+            expires = datetime(1970, 1, 1)
+        return str(Cookie(
+            name=self.cookie_name,
+            value=token,
+            path=request.script_name or '/',
+            domain=request.domain,
+            secure=self.secure,
+            expires=expires,
+            samesite=self.samesite.value,
+            httponly=self.httponly,
+        ))
+
+    def finalize(self, request: WSGIRequest, response):
+        token = request.context.get(self.token_key)
+        if token is None:
+            return response
+        if request.context.get(self.origin_key) == 'bearer':
+            # A bearer token cannot be replaced or dropped by a cookie.
+            if token:
+                response.headers[self.renew_header] = token
+        elif self.cookie_name is not None:
+            response.cookies[self.cookie_name] = self.cookie(request, token)
+        return response
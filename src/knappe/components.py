@@ -136,22 +136,25 @@ class Registry(t.Generic[C], Mapping[Signature, C]):
 
     factory: t.ClassVar[t.Type[C]] = Component
 
-    __slots__ = ('_resolver', '_ordered')
+    __slots__ = ('_resolver', '_ordered', 'version')
 
     def __init__(self, *components: t.Iterable[t.Tuple[Signature, C]]):
         self._ordered: PriorityChain[Signature] = PriorityChain()
         self._resolver: Resolver = Resolver()
+        self.version = 0  # Incremented on change, to invalidate lookups.
         super().__init__(components)
 
     def __setitem__(self, signature: Signature, component: C):
         self._ordered.add(signature)
         self._resolver.register(signature)
         super().__setitem__(signature, component)
+        self.version += 1
 
     def __delitem__(self, signature):
         component = self[signature]
         super().__delitem__(signature)
         del self._ordered[(signature, component)]
+        self.version += 1
 
     def find_one(self, *args):
         match = self._resolver.resolve(args)
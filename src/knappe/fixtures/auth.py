@@ -32,3 +32,6 @@ class DictSource(Source[Request, Credentials]):
         if uid in self.users:
             return UserObject(uid)
         return None
+
+    def fetch_many(self, uids, request) -> t.Mapping[UserId, User]:
+        return {uid: UserObject(uid) for uid in uids if uid in self.users}
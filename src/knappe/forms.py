@@ -0,0 +1,237 @@
+import re
+import typing as t
+from http import HTTPStatus
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qsl
+from horseman.exceptions import HTTPError
+from horseman.types import Environ
+
+
+OPTION = re.compile(r';\s*([^\s=;]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class BodyLimits(t.NamedTuple):
+    max_body_size: t.Optional[int] = 64 * 1024 * 1024
+    max_form_size: int = 2 * 1024 * 1024  # Total of the non-file fields.
+    max_file_size: t.Optional[int] = None
+    max_parts: int = 1000
+    max_header_size: int = 16 * 1024  # Headers block of a multipart part.
+    memory_threshold: int = 1024 * 1024  # Files are spooled on disk above.
+    chunk_size: int = 64 * 1024
+
+
+def parse_header(value: str) -> t.Tuple[str, t.Dict[str, str]]:
+    """Parses a header value with options, such as `Content-Type`
+    or `Content-Disposition`.
+    """
+    main, _, rest = value.partition(';')
+    options = {}
+    for name, option in OPTION.findall(';' + rest):
+        if option[:1] == option[-1:] == '"':
+            option = re.sub(r'\\(.)', r'\1', option[1:-1])
+        options[name.lower()] = option.strip()
+    return main.strip().lower(), options
+
+
+def body_chunks(environ: Environ, limits: BodyLimits) -> t.Iterator[bytes]:
+    """Reads the request body by chunks, never past its declared
+    length, enforcing the `max_body_size` limit.
+    """
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length.')
+    if limits.max_body_size is not None and length > limits.max_body_size:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    stream = environ['wsgi.input']
+    while length > 0:
+        if not (chunk := stream.read(min(limits.chunk_size, length))):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Truncated body.')
+        length -= len(chunk)
+        yield chunk
+
+
+class Part:
+    """Part of a multipart body, as it is streamed.
+    The content must be consumed before reaching the next part.
+    """
+
+    __slots__ = ('headers', 'name', 'filename', 'content_type', '_content')
+
+    def __init__(self, headers: t.Mapping[str, str],
+                 content: t.Iterator[bytes]):
+        self.headers = headers
+        _, options = parse_header(headers.get('content-disposition', ''))
+        self.name = options.get('name')
+        self.filename = options.get('filename')
+        self.content_type = headers.get('content-type', 'text/plain')
+        self._content = content
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        return self._content
+
+    def read(self) -> bytes:
+        return b''.join(self._content)
+
+
+class MultipartReader:
+    """Streaming parser of a `multipart/form-data` body.
+    Only a window of the body is held in memory.
+    """
+
+    def __init__(self, chunks: t.Iterable[bytes], boundary: str,
+                 limits: BodyLimits):
+        self.chunks = iter(chunks)
+        self.limits = limits
+        self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+        # The first delimiter is not preceded by a line break.
+        self.buffer = bytearray(b'\r\n')
+
+    def fill(self):
+        if (chunk := next(self.chunks, None)) is None:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, 'Truncated multipart body.')
+        self.buffer += chunk
+
+    def read_until(self, marker: bytes, limit: int) -> bytes:
+        while (index := self.buffer.find(marker)) == -1:
+            if len(self.buffer) > limit:
+                raise HTTPError(
+                    HTTPStatus.BAD_REQUEST, 'Malformed multipart body.')
+            self.fill()
+        data = bytes(self.buffer[:index])
+        del self.buffer[:index + len(marker)]
+        return data
+
+    def content(self) -> t.Iterator[bytes]:
+        # The end of the buffer could be the start of a delimiter.
+        margin = len(self.delimiter) - 1
+        while (index := self.buffer.find(self.delimiter)) == -1:
+            if len(self.buffer) > margin:
+                yield bytes(self.buffer[:-margin])
+                del self.buffer[:-margin]
+            self.fill()
+        if index:
+            yield bytes(self.buffer[:index])
+        del self.buffer[:index + len(self.delimiter)]
+
+    def headers(self) -> t.Dict[str, str]:
+        while len(self.buffer) < 2:
+            self.fill()
+        if self.buffer.startswith(b'\r\n'):
+            del self.buffer[:2]
+            return {}
+        block = self.read_until(b'\r\n\r\n', self.limits.max_header_size)
+        headers = {}
+        for line in block.decode('utf-8', 'replace').split('\r\n'):
+            name, sep, value = line.partition(':')
+            if not sep:
+                raise HTTPError(
+                    HTTPStatus.BAD_REQUEST, 'Malformed multipart header.')
+            headers[name.strip().lower()] = value.strip()
+        return headers
+
+    def __iter__(self) -> t.Iterator[Part]:
+        # Skipping the preamble, if any.
+        self.read_until(self.delimiter, self.limits.max_header_size)
+        count = 0
+        while True:
+            while len(self.buffer) < 2:
+                self.fill()
+            if self.buffer.startswith(b'--'):
+                break  # Closing delimiter. The epilogue is ignored.
+            self.read_until(b'\r\n', self.limits.max_header_size)
+            if (count := count + 1) > self.limits.max_parts:
+                raise HTTPError(
+                    HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Too many parts.')
+            part = Part(self.headers(), self.content())
+            yield part
+            for _ in part:
+                pass  # Draining what the consumer left.
+
+
+class FilePart(t.NamedTuple):
+    name: str
+    filename: str
+    content_type: str
+    file: SpooledTemporaryFile
+    size: int
+
+
+class FormData:
+    """Parsed form: the values of the fields and the uploaded files,
+    by name. Files are spooled to the disk above a size threshold.
+    """
+
+    form: t.Dict[str, t.List[str]]
+    files: t.Dict[str, t.List[FilePart]]
+
+    def __init__(self):
+        self.form = {}
+        self.files = {}
+
+    def get(self, name: str, default: t.Any = None) -> t.Any:
+        if values := self.form.get(name):
+            return values[0]
+        return default
+
+    def close(self):
+        for parts in self.files.values():
+            for part in parts:
+                part.file.close()
+
+    @classmethod
+    def from_urlencoded(cls, chunks: t.Iterable[bytes], limits: BodyLimits,
+                        charset: str = 'utf-8') -> 'FormData':
+        body = bytearray()
+        for chunk in chunks:
+            body += chunk
+            if len(body) > limits.max_form_size:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        data = cls()
+        try:
+            fields = parse_qsl(body.decode(charset), keep_blank_values=True)
+        except UnicodeDecodeError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Undecodable form.')
+        for name, value in fields:
+            data.form.setdefault(name, []).append(value)
+        return data
+
+    @classmethod
+    def from_parts(cls, parts: t.Iterable[Part],
+                   limits: BodyLimits) -> 'FormData':
+        data = cls()
+        form_size = 0
+        for part in parts:
+            if part.name is None:
+                continue
+            if part.filename is None:
+                value = bytearray()
+                for chunk in part:
+                    form_size += len(chunk)
+                    if form_size > limits.max_form_size:
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                    value += chunk
+                data.form.setdefault(part.name, []).append(
+                    value.decode('utf-8', 'replace'))
+                continue
+
+            spooled = SpooledTemporaryFile(
+                max_size=limits.memory_threshold)
+            size = 0
+            for chunk in part:
+                size += len(chunk)
+                if limits.max_file_size is not None and (
+                        size > limits.max_file_size):
+                    spooled.close()
+                    raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                spooled.write(chunk)
+            spooled.seek(0)
+            data.files.setdefault(part.name, []).append(FilePart(
+                name=part.name,
+                filename=part.filename,
+                content_type=part.content_type,
+                file=spooled,
+                size=size
+            ))
+        return data
@@ -1,4 +1,8 @@
-from .auth import Filter, Authentication, security_bypass, secured, TwoFA
+from .auth import (
+    Filter, Bypass, Check, Authentication, security_bypass, secured, TwoFA)
 from .flash import flash, Message, SessionMessages
 from .session import HTTPSession
-from .transaction import Transaction
\ No newline at end of file
+from .transaction import Transaction
+from .compression import Compression
+from .conditional import ConditionalGET
+from .cache import ResponseCache
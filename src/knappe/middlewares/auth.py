@@ -1,6 +1,7 @@
 import typing as t
 from knappe.response import Response
 from knappe.request import WSGIRequest
+from knappe.routing import PathMatcher
 from knappe.auth import Authenticator
 from knappe.types import RqT, RsT, Handler
 
@@ -8,12 +9,90 @@ from knappe.types import RqT, RsT, Handler
 Filter = t.Callable[[Handler, RqT], t.Optional[RsT]]
 
 
+class Bypass:
+    """Filter letting the request through, unchallenged, if its path
+    matches one of the unprotected patterns.
+    """
+
+    __slots__ = ('unprotected',)
+
+    def __init__(self, unprotected: PathMatcher):
+        self.unprotected = unprotected
+
+    def __call__(self,
+                 caller: Handler[WSGIRequest, Response],
+                 request: WSGIRequest):
+        if request.path in self.unprotected:
+            return caller(request)
+
+    def __or__(self, other: 'Bypass'):
+        if not isinstance(other, Bypass):
+            raise TypeError(
+                f"Unsupported merge between {self.__class__!r} "
+                f"and {other.__class__!r}"
+            )
+        return self.__class__(self.unprotected | other.unprotected)
+
+
+class Check:
+    """Filter redirecting the requests failing the check to `path`.
+    """
+
+    __slots__ = ('path', 'checker')
+
+    def __init__(self, path: str, checker: t.Callable[[WSGIRequest], bool]):
+        self.path = path
+        self.checker = checker
+
+    def __call__(self,
+                 caller: Handler[WSGIRequest, Response],
+                 request: WSGIRequest):
+        if not self.checker(request):
+            return Response.redirect(request.script_name + self.path)
+
+
+class TwoFA(Check):
+    """Check of the second factor. Its own page is let through.
+    """
+
+    __slots__ = ()
+
+    def __call__(self,
+                 caller: Handler[WSGIRequest, Response],
+                 request: WSGIRequest):
+        if request.path == self.path:
+            return caller(request)
+        return super().__call__(caller, request)
+
+    def split(self) -> t.Tuple[Bypass, Check]:
+        return Bypass(PathMatcher([self.path])), Check(self.path, self.checker)
+
+
+def compile_filters(filters: t.Iterable[Filter]) -> t.Tuple[Filter, ...]:
+    """Successive bypass filters are merged into a single one,
+    in order to decide on the whole set of patterns in one lookup.
+    The page of a `TwoFA` filter is a bypass, merged with the bypass
+    filters preceding it. A check between two bypass filters keeps
+    them apart: the order of the filters is preserved.
+    """
+    compiled: t.List[Filter] = []
+    for filter in filters:
+        parts = filter.split() if isinstance(filter, TwoFA) else (filter,)
+        for part in parts:
+            if isinstance(part, Bypass) and compiled and isinstance(
+                    compiled[-1], Bypass):
+                compiled[-1] = compiled[-1] | part
+            else:
+                compiled.append(part)
+    return tuple(compiled)
+
+
 class Authentication(t.Generic[RqT, RsT]):
 
     def __init__(self,
                  authenticator: Authenticator,
                  filters: t.Optional[t.Sequence[Filter]] = None):
-        self.filters = filters
+        self.filters = compile_filters(filters or ())
         self.authenticator = authenticator
 
     def __call__(self,
@@ -24,41 +103,30 @@ class Authentication(t.Generic[RqT, RsT]):
             request.context['authentication'] = self.authenticator
             try:
                 _ = self.authenticator.identify(request)
-                if self.filters:
-                    for filter in self.filters:
-                        if (resp := filter(handler, request)) is not None:
-                            return resp
-                return handler(request)
+                for filter in self.filters:
+                    if (resp := filter(handler, request)) is not None:
+                        break
+                else:
+                    resp = handler(request)
+                return self.authenticator.finalize(request, resp)
             finally:
                 del request.context['authentication']
         return authentication_middleware
 
 
-def security_bypass(*urls: str) -> Filter:
-    unprotected: t.FrozenSet[str] = frozenset(*urls)
+def security_bypass(*urls: str | t.Iterable[str]) -> Filter:
+    patterns: t.List[str] = []
+    for url in urls:
+        if isinstance(url, str):
+            patterns.append(url)
+        else:
+            patterns.extend(url)
+    return Bypass(PathMatcher(patterns))
 
-    def _filter(caller: Handler[WSGIRequest, Response], request: WSGIRequest):
-        if request.path in unprotected:
-            return caller(request)
 
-    return _filter
+def authenticated(request: WSGIRequest) -> bool:
+    return request.context.get('user') is not None
 
 
 def secured(path: str) -> Filter:
-
-    def _filter(caller: Handler[WSGIRequest, Response], request: WSGIRequest):
-        if request.context.get('user') is None:
-            return Response.redirect(request.script_name + path)
-
-    return _filter
-
-
-def TwoFA(path: str, checker: t.Callable[[WSGIRequest], bool]) -> Filter:
-
-    def _filter(caller: Handler[WSGIRequest, Response], request: WSGIRequest):
-        if request.path == path:
-            return caller(request)
-        if not checker(request):
-            return Response.redirect(request.script_name + path)
-
-    return _filter
+    return Check(path, authenticated)
@@ -0,0 +1,221 @@
+import time
+import logging
+import threading
+import typing as t
+from collections import OrderedDict
+from http import HTTPStatus
+from horseman.response import Headers
+from knappe.request import WSGIRequest
+from knappe.response import Response, FileResponse
+from knappe.types import Handler
+
+
+Logger = logging.getLogger(__name__)
+
+CacheKey = t.Tuple[t.Optional[str], ...]
+
+
+class CachedResponse(t.NamedTuple):
+    status: HTTPStatus
+    body: bytes | str
+    headers: t.Tuple[t.Tuple[str, str], ...]
+    expires: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def response(self) -> Response:
+        # A fresh response: outer middlewares are free to alter it.
+        return Response(self.status, self.body, Headers(self.headers))
+
+
+class LRUStore:
+    """Thread-safe LRU mapping of cached responses, bounded by number
+    of entries and by the total size of the bodies.
+    """
+
+    def __init__(self, max_entries: int, max_size: int):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.entries: OrderedDict[CacheKey, CachedResponse] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: CacheKey) -> t.Optional[CachedResponse]:
+        with self.lock:
+            if (entry := self.entries.get(key)) is None:
+                return None
+            if entry.expires <= time.monotonic():
+                del self.entries[key]
+                self.size -= entry.size
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key: CacheKey, entry: CachedResponse):
+        if entry.size > self.max_size:
+            return
+        with self.lock:
+            if (previous := self.entries.pop(key, None)) is not None:
+                self.size -= previous.size
+            self.entries[key] = entry
+            self.size += entry.size
+            while len(self.entries) > self.max_entries or (
+                    self.size > self.max_size):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class ResponseCache:
+    """Caches the full responses served to anonymous users.
+
+    Only routes with a positive TTL are cached: the TTL is read from
+    the route metadata and defaults to `ttl`. The key is made of the
+    method, path, query string and the configured request headers
+    and cookies. Requests from a logged in user and responses setting
+    cookies or varying on other headers are never cached.
+    The user is only known inside the session and authentication
+    middlewares: requests carrying credentials, as an `Authorization`
+    header or one of the `private_cookies`, are never served from the
+    cache, wherever the cache is placed in the pipeline.
+    Concurrent misses on the same key are rendered once: the other
+    requests wait for the result, up to `wait` seconds.
+    """
+
+    class Configuration(t.NamedTuple):
+        ttl: float = 0  # Seconds. Cache disabled if not positive.
+        max_entries: int = 1024
+        max_size: int = 64 * 1024 * 1024  # Total bytes of cached bodies.
+        headers: t.Tuple[str, ...] = ('Accept-Encoding',)
+        cookies: t.Tuple[str, ...] = ()
+        methods: t.FrozenSet[str] = frozenset(('GET', 'HEAD'))
+        metadata_key: str = 'cache_ttl'
+        user_key: str = 'user'  # Key of the user in the context.
+        session_key: str = 'user'  # Key of the user id in the session.
+        # Session and authentication token cookies.
+        private_cookies: t.Tuple[str, ...] = ('sid', 'auth_token')
+        wait: float = 5.0
+
+    def __init__(self, *args, **kwargs):
+        self.config = self.Configuration(*args, **kwargs)
+        self.store = LRUStore(self.config.max_entries, self.config.max_size)
+        self.inflight: t.Dict[CacheKey, threading.Event] = {}
+        self.lock = threading.Lock()
+        self.varying = frozenset(
+            header.lower() for header in self.config.headers)
+        self.environ_keys = tuple(
+            'HTTP_' + header.upper().replace('-', '_')
+            for header in self.config.headers
+        )
+
+    def ttl(self, request: WSGIRequest) -> float:
+        if (endpoint := getattr(request, 'endpoint', None)) is None:
+            return self.config.ttl
+        return endpoint.route.metadata.get(
+            self.config.metadata_key, self.config.ttl)
+
+    def key(self, request: WSGIRequest) -> CacheKey:
+        key = [
+            request.method,
+            request.script_name,
+            request.path,
+            request.get('QUERY_STRING', ''),
+        ]
+        key.extend(request.get(name) for name in self.environ_keys)
+        if self.config.cookies:
+            cookies = request.cookies or {}
+            key.extend(cookies.get(name) for name in self.config.cookies)
+        return tuple(key)
+
+    def anonymous(self, request: WSGIRequest) -> bool:
+        if request.get('HTTP_AUTHORIZATION'):
+            return False
+        if self.config.private_cookies and (cookies := request.cookies):
+            for name in self.config.private_cookies:
+                if name in cookies:
+                    return False
+        if request.context.get(self.config.user_key) is not None:
+            return False
+        if (session := request.context.get('http_session')) is not None:
+            return session.get(self.config.session_key) is None
+        return True
+
+    def cacheable(self, response) -> bool:
+        if not isinstance(response, Response) or isinstance(
+                response, FileResponse):
+            return False
+        if response.status != HTTPStatus.OK:
+            return False
+        if not isinstance(response.body, (bytes, str)):
+            # Streamed bodies would need to be buffered.
+            return False
+        if 'Set-Cookie' in response.headers or response.cookies:
+            return False
+        control = response.headers.get('Cache-Control', '').lower()
+        if 'no-store' in control or 'private' in control:
+            return False
+        if vary := response.headers.get('Vary'):
+            for header in vary.split(','):
+                if header.strip().lower() not in self.varying:
+                    return False
+        return True
+
+    def render(self, handler, request: WSGIRequest,
+               key: CacheKey, ttl: float) -> Response:
+        response = handler(request)
+        if self.anonymous(request) and self.cacheable(response):
+            self.store.set(key, CachedResponse(
+                status=response.status,
+                body=response.body,
+                headers=tuple(response.headers.items()),
+                expires=time.monotonic() + ttl
+            ))
+        return response
+
+    def __call__(self,
+                 handler: Handler[WSGIRequest, Response],
+                 globalconf: t.Optional[t.Mapping] = None
+                 ) -> Handler[WSGIRequest, Response]:
+
+        def cache_middleware(request: WSGIRequest) -> Response:
+            if request.method not in self.config.methods:
+                return handler(request)
+            if (ttl := self.ttl(request)) <= 0:
+                return handler(request)
+            if not self.anonymous(request):
+                return handler(request)
+
+            key = self.key(request)
+            with self.lock:
+                if (entry := self.store.get(key)) is not None:
+                    return entry.response()
+                event = self.inflight.get(key)
+                if leader := event is None:
+                    event = self.inflight[key] = threading.Event()
+
+            if not leader:
+                if not event.wait(self.config.wait):
+                    Logger.warning(
+                        'Timed out waiting for the rendering of %r.', key)
+                if (entry := self.store.get(key)) is not None:
+                    return entry.response()
+                # The response was not cacheable: render our own.
+                return handler(request)
+
+            try:
+                return self.render(handler, request, key, ttl)
+            finally:
+                with self.lock:
+                    del self.inflight[key]
+                event.set()
+
+        return cache_middleware
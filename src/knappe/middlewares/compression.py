@@ -0,0 +1,143 @@
+import zlib
+import typing as t
+from http import HTTPStatus
+from frozendict import frozendict
+from knappe.request import WSGIRequest
+from knappe.response import Response, FileResponse
+from knappe.types import Handler
+
+
+WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+INCOMPRESSIBLE = (
+    'image/', 'audio/', 'video/', 'font/woff',
+    'application/zip', 'application/gzip', 'application/x-gzip',
+    'application/x-bzip2', 'application/x-7z-compressed',
+    'application/pdf', 'application/octet-stream',
+)
+
+
+def accepted_encodings(header: str) -> t.Dict[str, float]:
+    encodings = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        if not (name := name.strip().lower()):
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def compressed(chunks: t.Iterable[bytes | str],
+               encoder) -> t.Iterator[bytes]:
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if data := encoder.compress(chunk):
+            yield data
+    yield encoder.flush()
+
+
+class Compression:
+
+    class Configuration(t.NamedTuple):
+        encodings: t.Sequence[str] = ('gzip', 'deflate')  # By preference.
+        minimum_size: int = 500
+        level: int = 6
+        levels: t.Mapping[str, int] = frozendict()  # Level per mimetype.
+        excluded: t.Tuple[str, ...] = INCOMPRESSIBLE  # Mimetype prefixes.
+
+    def __init__(self, *args, **kwargs):
+        self.config = self.Configuration(*args, **kwargs)
+        for encoding in self.config.encodings:
+            if encoding not in WBITS:
+                raise ValueError(f'Unsupported encoding: {encoding!r}.')
+
+    def negotiate(self, request: WSGIRequest) -> t.Optional[str]:
+        if not (header := request.get('HTTP_ACCEPT_ENCODING')):
+            return None
+        accepted = accepted_encodings(header)
+        wildcard = accepted.get('*', 0.0)
+        for encoding in self.config.encodings:
+            if accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return None
+
+    def compressible(self, response) -> t.Optional[str]:
+        """Returns the mimetype of a compressible response.
+        """
+        if not isinstance(response, Response) or isinstance(
+                response, FileResponse):
+            # File responses are served by ranges or by the server.
+            return None
+        if response.status < 200 or response.status in (
+                HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+            return None
+        if response.body is None or 'Content-Encoding' in response.headers:
+            return None
+        mimetype = response.headers.get(
+            'Content-Type', '').split(';', 1)[0].strip().lower()
+        if not mimetype or mimetype.startswith(self.config.excluded):
+            return None
+        return mimetype
+
+    def __call__(self,
+                 handler: Handler[WSGIRequest, Response],
+                 globalconf: t.Optional[t.Mapping] = None
+                 ) -> Handler[WSGIRequest, Response]:
+
+        def compression_middleware(request: WSGIRequest) -> Response:
+            response = handler(request)
+            if (mimetype := self.compressible(response)) is None:
+                return response
+
+            vary = response.headers.get('Vary')
+            if vary is None:
+                response.headers['Vary'] = 'Accept-Encoding'
+            elif 'accept-encoding' not in vary.lower() and vary != '*':
+                response.headers['Vary'] = f'{vary}, Accept-Encoding'
+
+            if (encoding := self.negotiate(request)) is None:
+                return response
+
+            body = response.body
+            if isinstance(body, str):
+                body = body.encode()
+            if isinstance(body, bytes):
+                size = len(body)
+            elif length := response.headers.get('Content-Length'):
+                size = int(length)
+            else:
+                size = None
+            if size is not None and size < self.config.minimum_size:
+                return response
+
+            encoder = zlib.compressobj(
+                self.config.levels.get(mimetype, self.config.level),
+                zlib.DEFLATED,
+                WBITS[encoding]
+            )
+            if isinstance(body, bytes):
+                response.body = encoder.compress(body) + encoder.flush()
+                response.headers['Content-Length'] = str(len(response.body))
+            else:
+                response.body = compressed(body, encoder)
+                response.headers.pop('Content-Length', None)
+
+            response.headers['Content-Encoding'] = encoding
+            if (etag := response.headers.get('ETag')) and (
+                    not etag.startswith('W/')):
+                # The representation changed: it is no more byte-equal.
+                response.headers['ETag'] = f'W/{etag}'
+            return response
+
+        return compression_middleware
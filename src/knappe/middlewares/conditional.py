@@ -0,0 +1,113 @@
+import zlib
+import typing as t
+from http import HTTPStatus
+from knappe.request import WSGIRequest
+from knappe.response import Response, FileResponse
+from knappe.types import Handler
+from knappe.utils import etags_match
+
+
+Versioner = t.Callable[[WSGIRequest], t.Optional[str]]
+
+
+def body_etag(body: bytes | str | t.Sequence[bytes]) -> t.Optional[str]:
+    """Strong ETag over a fully known body, using a fast checksum.
+    Streamed bodies are not hashed: it would require buffering them.
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    elif isinstance(body, (list, tuple)) and all(
+            isinstance(chunk, bytes) for chunk in body):
+        body = b''.join(body)
+    if not isinstance(body, bytes):
+        return None
+    return f'"{zlib.crc32(body):08x}-{len(body):x}"'
+
+
+def quoted(version: str) -> str:
+    if version.startswith(('"', 'W/"')):
+        return version
+    return f'"{version}"'
+
+
+def not_modified(response: Response):
+    response.status = HTTPStatus.NOT_MODIFIED
+    response.body = None
+    for name in ('Content-Type', 'Content-Length', 'Content-Encoding'):
+        response.headers.pop(name, None)
+    return response
+
+
+class ConditionalGET:
+    """Answers `If-None-Match` requests with a bodyless 304 when the
+    ETag of the response matches.
+
+    The ETag is the one provided by the handler or a checksum of the
+    body. A route can provide a versioner, a callable returning the
+    current version of the resource from the request, in its metadata:
+    it is used as ETag and allows to skip the handler entirely.
+    As the handler does not run, the headers a 200 response would
+    carry, such as `Cache-Control` or `Vary`, are taken from the
+    `headers_key` metadata of the route. Without it, the 304 only
+    carries the ETag.
+    """
+
+    class Configuration(t.NamedTuple):
+        metadata_key: str = 'etag'
+        headers_key: str = 'etag_headers'
+
+    def __init__(self, *args, **kwargs):
+        self.config = self.Configuration(*args, **kwargs)
+
+    def metadata(self, request: WSGIRequest) -> t.Mapping[str, t.Any]:
+        if (endpoint := getattr(request, 'endpoint', None)) is None:
+            return {}
+        return endpoint.route.metadata
+
+    def versioner(self, request: WSGIRequest) -> t.Optional[Versioner]:
+        return self.metadata(request).get(self.config.metadata_key)
+
+    def __call__(self,
+                 handler: Handler[WSGIRequest, Response],
+                 globalconf: t.Optional[t.Mapping] = None
+                 ) -> Handler[WSGIRequest, Response]:
+
+        def conditional_middleware(request: WSGIRequest) -> Response:
+            if request.method not in ('GET', 'HEAD'):
+                return handler(request)
+
+            none_match = request.get('HTTP_IF_NONE_MATCH')
+            etag = None
+            if (versioner := self.versioner(request)) is not None:
+                if (version := versioner(request)) is not None:
+                    etag = quoted(version)
+                    if none_match is not None and etags_match(
+                            none_match, etag):
+                        headers = self.metadata(request).get(
+                            self.config.headers_key, {})
+                        return Response(
+                            HTTPStatus.NOT_MODIFIED,
+                            headers={**headers, 'ETag': etag}
+                        )
+
+            response = handler(request)
+            if not isinstance(response, Response) or isinstance(
+                    response, FileResponse):
+                # File responses handle their own validation.
+                return response
+            if response.status != HTTPStatus.OK:
+                return response
+
+            if 'ETag' in response.headers:
+                etag = response.headers['ETag']
+            else:
+                if etag is None and (
+                        etag := body_etag(response.body)) is None:
+                    return response
+                response.headers['ETag'] = etag
+
+            if none_match is not None and etags_match(none_match, etag):
+                return not_modified(response)
+            return response
+
+        return conditional_middleware
@@ -79,11 +79,10 @@ class HTTPSession:
             elif session.new:
                 return response
 
-            domain = request['HTTP_HOST'].split(':', 1)[0]
             cookie = self.manager.cookie(
                 session.sid,
                 request.script_name or '/',
-                domain,
+                request.domain,
                 secure=self.config.secure,
                 samesite=self.config.samesite,
                 httponly=self.config.httponly
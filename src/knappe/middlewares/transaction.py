@@ -1,51 +1,200 @@
+import time
+import random
+import logging
 import typing as t
 from transaction import TransactionManager
+from transaction.interfaces import ITransaction, TransientError
 from prejudice import resolve_constraints
 from prejudice.errors import ConstraintError
 from prejudice.types import Predicates
+from knappe.request import STREAMED
 from knappe.response import Response
 from knappe.types import Handler
 
 
+Logger = logging.getLogger(__name__)
+OnRetry = t.Callable[[t.Any, int, Exception, float], None]
+
+
 def bad_response(request, response):
     if isinstance(response, Response) and response.status >= 400:
         raise ConstraintError('Response is doomed.')
 
 
+def retryable(manager: TransactionManager, error: Exception) -> bool:
+    """Whether the error is transient: a `TransientError` or an error
+    a joined data manager accepts to retry, through `should_retry`.
+    """
+    # Private API: the check of `TransactionManager.attempts`, which
+    # knows the joined data managers. Falls back on the public part.
+    check = getattr(manager, '_retryable', None)
+    if check is None:
+        return isinstance(error, TransientError)
+    return check(error.__class__, error)
+
+
+def joined(txn: ITransaction) -> bool:
+    """Whether data managers joined the transaction.
+    """
+    # Private API: `transaction.Transaction` keeps the joined data
+    # managers in `_resources`. Without it, they are assumed to have
+    # joined, the safe side: the vetoes apply.
+    resources = getattr(txn, '_resources', None)
+    return resources is None or bool(resources)
+
+
+def replayable(request, session_modified: bool) -> bool:
+    """Whether a failed attempt left the request fit for another one.
+    The context is restored, as a shallow copy: a streamed body cannot
+    be read again and the changes to the session would be kept.
+    """
+    if getattr(request, '_form', None) is STREAMED:
+        return False
+    session = request.context.get('http_session')
+    return session_modified or not getattr(session, 'modified', False)
+
+
+class LazyTransactionManager:
+    """Transaction manager proxy beginning the transaction only
+    when it is first requested, usually by a joining resource.
+    """
+
+    __slots__ = ('manager', 'txn')
+
+    manager: TransactionManager
+    txn: t.Optional[ITransaction]
+
+    def __init__(self, manager: TransactionManager):
+        self.manager = manager
+        self.txn = None
+
+    def get(self) -> ITransaction:
+        if self.txn is None:
+            self.txn = self.manager.begin()
+        return self.txn
+
+    begin = get
+
+    def isDoomed(self) -> bool:
+        return self.txn is not None and self.txn.isDoomed()
+
+    def doom(self):
+        return self.get().doom()
+
+    def savepoint(self, optimistic=False):
+        return self.get().savepoint(optimistic)
+
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
+
+
 class Transaction:
+    """Runs the handler in a transaction, committed unless doomed or
+    vetoed. Attempts failing on a transient error are retried, with a
+    fresh copy of the initial context, unless the request cannot be
+    replayed: its body was streamed or its session was modified.
+    Other side effects, such as reading `wsgi.input` directly, are not
+    detected: such handlers should keep a single attempt.
+    """
 
     class Configuration(t.NamedTuple):
         veto: Predicates = (bad_response,)
         factory: t.Callable[[], TransactionManager] = (
             lambda: TransactionManager(explicit=True)
         )
+        lazy: bool = False
+        attempts: int = 1
+        backoff: float = 0.05  # seconds, doubled at each retry.
+        max_backoff: float = 1.0
+        on_retry: t.Optional[OnRetry] = None
 
     def __init__(self, *args, **kwargs):
         self.config = self.Configuration(*args, **kwargs)
+        if self.config.attempts < 1:
+            raise ValueError('At least one attempt is required.')
+
+    def finish(self, txn: ITransaction, request, response):
+        if txn.isDoomed():
+            txn.abort()
+        elif self.config.lazy and not joined(txn):
+            # Nothing joined: there is nothing to veto.
+            txn.commit()
+        elif errors := resolve_constraints(
+                self.config.veto, request, response):
+            raise errors
+        else:
+            txn.commit()
+
+    def delay(self, attempt: int) -> float:
+        """Capped exponential backoff, with full jitter.
+        """
+        ceiling = min(
+            self.config.max_backoff,
+            self.config.backoff * (2 ** (attempt - 1))
+        )
+        return random.uniform(0, ceiling)
+
+    def retry(self, request, attempt: int, error: Exception):
+        delay = self.delay(attempt)
+        Logger.info(
+            f'Retryable error {error!r} on attempt {attempt}: '
+            f'retrying in {delay:.3f}s.'
+        )
+        if self.config.on_retry is not None:
+            self.config.on_retry(request, attempt, error, delay)
+        time.sleep(delay)
 
     def __call__(self,
                  handler: Handler,
                  globalconf: t.Optional[t.Mapping] = None) -> Handler:
 
+        lazy = self.config.lazy
+        attempts = self.config.attempts
+
         def transaction_middleware(request):
             manager = request.context.get('transaction_manager')
             if manager is None:
                 manager = self.config.factory()
-                request.context['transaction_manager'] = manager
+            if attempts > 1:
+                initial = dict(request.context)
+                session_modified = getattr(
+                    initial.get('http_session'), 'modified', False)
 
-            txn = manager.begin()
-            try:
-                response = handler(request)
-                if txn.isDoomed():
-                    txn.abort()
-                elif errors := resolve_constraints(
-                        self.config.veto, request, response):
-                    raise errors
+            for attempt in range(1, attempts + 1):
+                if attempt > 1:
+                    # Fresh context for the new attempt.
+                    request.context.clear()
+                    request.context.update(initial)
+                if lazy:
+                    proxy = LazyTransactionManager(manager)
+                    request.context['transaction_manager'] = proxy
                 else:
-                    txn.commit()
-                return response
-            except Exception:
-                txn.abort()
-                raise
+                    request.context['transaction_manager'] = manager
+                    txn = manager.begin()
+                try:
+                    response = handler(request)
+                    if lazy:
+                        txn = proxy.txn
+                    if txn is not None:
+                        self.finish(txn, request, response)
+                    return response
+                except Exception as exc:
+                    if lazy and (txn := proxy.txn) is None:
+                        raise
+                    # Retryability must be known before the abort.
+                    retry = attempt < attempts and retryable(manager, exc)
+                    txn.abort()
+                    if not retry:
+                        raise
+                    if not replayable(request, session_modified):
+                        Logger.warning(
+                            f'Retryable error {exc!r} on attempt {attempt}'
+                            ': the request cannot be replayed.')
+                        raise
+                    error = exc
+                finally:
+                    if lazy:
+                        request.context['transaction_manager'] = manager
+                self.retry(request, attempt, error)
 
         return transaction_middleware
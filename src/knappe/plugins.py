@@ -82,6 +82,9 @@ class Plugin(t.Generic[A]):
 
     def apply(self, app: A):
         if self.components:
+            owned = getattr(app, '__merged_components__', None)
+            if owned is None:
+                owned = app.__merged_components__ = {}
             for name, component in self.components._asdict().items():
                 trail = name.split('.')
                 attr = trail[-1]
@@ -91,7 +94,15 @@ class Plugin(t.Generic[A]):
                 if not hasattr(node, attr):
                     raise LookupError(
                         f"{app!r} has no component {attr!r}.")
-                setattr(node, attr, getattr(node, attr) | component)
+                value = getattr(node, attr)
+                if owned.get(name) is value:
+                    # Merged by a previous plugin: the app owns it and
+                    # it is merged in place, at the cost of new entries.
+                    value |= component
+                else:
+                    # Possibly shared with other apps: copied once.
+                    value = owned[name] = value | component
+                setattr(node, attr, value)
 
     def install(self, app: A):
         installed = getattr(app, '__installed_plugins__', None)
@@ -1,3 +1,3 @@
 from .html import html, HTMLWrapper, BoundHTMLWrapper
-from .json import json
+from .json import json, json_stream, ndjson
 from .template import template
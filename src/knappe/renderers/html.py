@@ -2,12 +2,50 @@ import wrapt
 import typing as t
 from chameleon.zpt.template import PageTemplate
 from knappe.response import Response
+from knappe.ui import UI
 
 
 DEFAULT = ""
 Default = t.Literal[DEFAULT]
 
 
+class Resolved(t.NamedTuple):
+    """Template and layout resolved from a UI. It remains current
+    as long as the UI templates and layouts are unchanged.
+    """
+    ui: UI
+    templates: t.Any
+    templates_version: int
+    layouts: t.Any
+    layouts_version: int
+    template: PageTemplate
+    layout: t.Optional[t.Callable] = None
+
+    @classmethod
+    def create(cls, ui: UI, template: PageTemplate,
+               layout: t.Optional[t.Callable] = None) -> 'Resolved':
+        return cls(
+            ui=ui,
+            templates=ui.templates,
+            templates_version=ui.templates.version,
+            layouts=ui.layouts,
+            layouts_version=ui.layouts.version,
+            template=template,
+            layout=layout
+        )
+
+    def current(self, ui: UI) -> bool:
+        if ui.templates.reload_interval is not None:
+            ui.templates.refresh()
+        return (
+            self.ui is ui
+            and self.templates is ui.templates
+            and self.templates_version == ui.templates.version
+            and self.layouts is ui.layouts
+            and self.layouts_version == ui.layouts.version
+        )
+
+
 class BoundHTMLWrapper(wrapt.BoundFunctionWrapper):
 
     def bare(self, *args, **kwargs):
@@ -32,42 +70,67 @@ class HTMLWrapper(wrapt.FunctionWrapper):
                  layout_name: str | Default | None,
                  code: int):
         super().__init__(wrapped, self.with_layout)
+        self._self_resolved: t.Dict[t.Tuple, Resolved] = {}
         self.template_name = template_name
         self.response_class = response_class
         self.default_template = default_template
         self.layout_name = layout_name
         self.code = code
 
-    def render(self, request, result, layout_name: str | None = None):
-        ui = request.context.get('ui')
-        namespace = {
-            'ui': ui,
-            'request': request,
-            'macro': ui is not None and ui.macros.macro or None,
-            'view': self.__wrapped__
-        }
-
-        if not self.template_name:
-            if not isinstance(result, str):
-                raise TypeError('Template is missing')
-            else:
-                rendered = result
-        elif ui is None:
-            if self.default_template is None:
-                raise NotImplementedError('No template.')
-            rendered = self.default_template.render(**(result | namespace))
-        else:
+    def resolve(self, request, ui: UI, layout_name: str | None
+                ) -> Resolved:
+        key = (id(ui), request.__class__, layout_name)
+        resolved = self._self_resolved.get(key)
+        if resolved is None or not resolved.current(ui):
             template = ui.templates.get(
                 self.template_name, self.default_template
             )
             if template is None:
                 raise NotImplementedError('No template.')
-            rendered = template.render(**(result | namespace))
+            layout = None
             if layout_name is not None:
                 layout = ui.layouts.find_one(
                     request, name=layout_name).value
-                rendered = layout(request, rendered, namespace)
-        return rendered
+            resolved = self._self_resolved[key] = Resolved.create(
+                ui, template, layout)
+        return resolved
+
+    def render(self, request, result, layout_name: str | None = None):
+        if not self.template_name:
+            if not isinstance(result, str):
+                raise TypeError('Template is missing')
+            return result
+
+        ui = request.context.get('ui')
+        if ui is None:
+            if self.default_template is None:
+                raise NotImplementedError('No template.')
+            return self.default_template.render(**{
+                **result,
+                'ui': None,
+                'request': request,
+                'macro': None,
+                'view': self.__wrapped__
+            })
+
+        resolved = self.resolve(request, ui, layout_name)
+        if resolved.layout is None:
+            return resolved.template.render(**{
+                **result,
+                'ui': ui,
+                'request': request,
+                'macro': ui.macros.macro,
+                'view': self.__wrapped__
+            })
+
+        namespace = {
+            'ui': ui,
+            'request': request,
+            'macro': ui.macros.macro,
+            'view': self.__wrapped__
+        }
+        rendered = resolved.template.render(**{**result, **namespace})
+        return resolved.layout(request, rendered, namespace)
 
     def bare(self, request):
         result = self.__wrapped__(request)
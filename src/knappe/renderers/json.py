@@ -1,16 +1,22 @@
 import wrapt
 import typing as t
 import functools
-from knappe.response import Response
+from knappe.response import Response, JSONDefault
 
 
 def json(
         wrapped=None,
         *,
-        response_class: t.Type[Response] = Response):
+        response_class: t.Type[Response] = Response,
+        default: t.Optional[JSONDefault] = None,
+        option: t.Optional[int] = None):
+    """Renders the result of the view as JSON. `default` and
+    `option` are handed to `orjson.dumps`.
+    """
     if wrapped is None:
         return functools.partial(
-            json, response_class=Response)
+            json, response_class=response_class,
+            default=default, option=option)
 
     @wrapt.decorator
     def renderer(wrapped, instance, args, kwargs):
@@ -18,5 +24,58 @@ def json(
         result = wrapped(request, **kwargs)
         if isinstance(result, Response):
             return result
-        return response_class.to_json(body=result)
+        return response_class.to_json(
+            body=result, default=default, option=option)
+    return renderer(wrapped)
+
+
+def json_stream(
+        wrapped=None,
+        *,
+        response_class: t.Type[Response] = Response,
+        batch: int = 500,
+        default: t.Optional[JSONDefault] = None,
+        option: t.Optional[int] = None):
+    """Renders the iterable returned by the view as a streamed JSON
+    array. Generators are consumed lazily, by batches of items.
+    """
+    if wrapped is None:
+        return functools.partial(
+            json_stream, response_class=response_class, batch=batch,
+            default=default, option=option)
+
+    @wrapt.decorator
+    def renderer(wrapped, instance, args, kwargs):
+        request = args[0]
+        result = wrapped(request, **kwargs)
+        if isinstance(result, Response):
+            return result
+        return response_class.to_json_stream(
+            body=result, batch=batch, default=default, option=option)
+    return renderer(wrapped)
+
+
+def ndjson(
+        wrapped=None,
+        *,
+        response_class: t.Type[Response] = Response,
+        batch: int = 500,
+        default: t.Optional[JSONDefault] = None,
+        option: t.Optional[int] = None):
+    """Renders the iterable returned by the view as a streamed
+    newline delimited JSON, one item per line.
+    """
+    if wrapped is None:
+        return functools.partial(
+            ndjson, response_class=response_class, batch=batch,
+            default=default, option=option)
+
+    @wrapt.decorator
+    def renderer(wrapped, instance, args, kwargs):
+        request = args[0]
+        result = wrapped(request, **kwargs)
+        if isinstance(result, Response):
+            return result
+        return response_class.to_ndjson(
+            body=result, batch=batch, default=default, option=option)
     return renderer(wrapped)
@@ -1,12 +1,25 @@
 import collections.abc
+import typing as t
 import wrapt
 from chameleon.zpt.template import PageTemplate
+from knappe.renderers.html import Resolved
 
 
 def template(
         template_name: str,
         default_template: PageTemplate | None = None):
 
+    resolutions: t.Dict[int, Resolved] = {}
+
+    def resolve(ui) -> Resolved:
+        resolved = resolutions.get(id(ui))
+        if resolved is None or not resolved.current(ui):
+            template = ui.templates.get(template_name, default_template)
+            if template is None:
+                raise NotImplementedError('No template.')
+            resolved = resolutions[id(ui)] = Resolved.create(ui, template)
+        return resolved
+
     @wrapt.decorator
     def renderer(wrapped, instance, args, kwargs):
         result = wrapped(*args, **kwargs)
@@ -16,22 +29,18 @@ def template(
 
         request = args[0]
         if ui := request.context.get('ui'):
-            template = ui.templates.get(template_name, default_template)
-            namespace = {
+            return resolve(ui).template.render(**{
                 'ui': ui,
                 'macro': ui.macros.macro,
                 'view': instance or wrapped,
                 'request': request,
                 **result
-            }
-        else:
-            template = default_template
-            namespace = {
-                'view': instance or wrapped,
-                **result
-            }
-        if template is None:
+            })
+        if default_template is None:
             raise NotImplementedError('No template.')
-        return template.render(**namespace)
+        return default_template.render(**{
+            'view': instance or wrapped,
+            **result
+        })
 
     return renderer
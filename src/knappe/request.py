@@ -1,13 +1,36 @@
+import sys
+import logging
+import functools
+import threading
 import typing as t
+from http import HTTPStatus
+from horseman.exceptions import HTTPError
 from horseman.environ import WSGIEnvironWrapper
 from horseman.types import Environ
 from knappe.types import Request, Application
 from knappe.meta import MatchedRoute
+from knappe.response import Response, FileResponse
+from knappe.utils import parse_accept
+from knappe.forms import (
+    BodyLimits, FormData, MultipartReader, Part, body_chunks, parse_header)
+
+
+Logger = logging.getLogger(__name__)
+STREAMED = object()  # The body was consumed through `parts`.
+DERIVED = ('_form', '_host', '_domain', '_accept')
 
 
 class WSGIRequest(Request, WSGIEnvironWrapper):
 
-    __slots__ = ('app', 'context')
+    __slots__ = (
+        'app', 'context', '_form',
+        # Derived values, computed on first access.
+        '_host', '_domain', '_accept'
+    )
+
+    body_limits: t.ClassVar[BodyLimits] = BodyLimits()
+    context_factory: t.ClassVar[
+        t.Callable[[], t.MutableMapping[str, t.Any]]] = dict
 
     def __init__(self,
                  environ: Environ,
@@ -15,7 +38,117 @@ class WSGIRequest(Request, WSGIEnvironWrapper):
                  context: t.MutableMapping[str, t.Any] = None):
         WSGIEnvironWrapper.__init__(self, environ)
         self.app = app
-        self.context = context if context is not None else {}
+        self.context = (
+            context if context is not None else self.context_factory())
+        self._form = None
+
+    def reset(self,
+              environ: Environ,
+              app: t.Optional[Application] = None,
+              context: t.Optional[t.Mapping[str, t.Any]] = None):
+        """Rebinds the request to a new environ, for reuse.
+        The context is cleared in place and every value derived
+        from the previous environ is dropped.
+        """
+        for name in DERIVED:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
+        if cached := getattr(self, '__dict__', None):
+            cached.clear()
+        if isinstance(self, dict):
+            # The wrapper holds a copy of the environ.
+            dict.clear(self)
+        WSGIEnvironWrapper.__init__(self, environ)
+        self.app = app
+        self.context.clear()
+        if context:
+            self.context.update(context)
+        self._form = None
+
+    @property
+    def host(self) -> str:
+        try:
+            return self._host
+        except AttributeError:
+            if not (host := self.get('HTTP_HOST')):
+                host = self['SERVER_NAME']
+                port = self.get('SERVER_PORT')
+                if port and port != (
+                        '443' if self.get('wsgi.url_scheme') == 'https'
+                        else '80'):
+                    host = f'{host}:{port}'
+            self._host = host
+            return host
+
+    @property
+    def domain(self) -> str:
+        """Host, without the port.
+        """
+        try:
+            return self._domain
+        except AttributeError:
+            host = self.host
+            if host.startswith('['):  # IPv6
+                domain = host[:host.find(']') + 1]
+            else:
+                domain = host.split(':', 1)[0]
+            self._domain = domain
+            return domain
+
+    @property
+    def accept(self) -> t.Tuple[t.Tuple[str, float], ...]:
+        """Accepted mimetypes with their quality, best first.
+        """
+        try:
+            return self._accept
+        except AttributeError:
+            accept = parse_accept(self.get('HTTP_ACCEPT', ''))
+            self._accept = accept
+            return accept
+
+    def parts(self) -> t.Iterator[Part]:
+        """Streams the parts of a multipart body, as they are read.
+        Each part content must be consumed before reaching the next.
+        """
+        if self._form is not None:
+            raise RuntimeError('The request body was already consumed.')
+        mimetype, options = parse_header(self.get('CONTENT_TYPE', ''))
+        if mimetype != 'multipart/form-data':
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, 'Expected a multipart body.')
+        if not (boundary := options.get('boundary')):
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, 'Missing multipart boundary.')
+        self._form = STREAMED
+        return iter(MultipartReader(
+            body_chunks(self, self.body_limits),
+            boundary,
+            self.body_limits
+        ))
+
+    @property
+    def form(self) -> FormData:
+        """Form data, parsed on first access, from an urlencoded
+        or multipart body.
+        """
+        if self._form is STREAMED:
+            raise RuntimeError('The request body was already consumed.')
+        if self._form is None:
+            mimetype, options = parse_header(self.get('CONTENT_TYPE', ''))
+            if mimetype == 'multipart/form-data':
+                self._form = FormData.from_parts(
+                    self.parts(), self.body_limits)
+            elif mimetype == 'application/x-www-form-urlencoded':
+                self._form = FormData.from_urlencoded(
+                    body_chunks(self, self.body_limits),
+                    self.body_limits,
+                    options.get('charset', 'utf-8')
+                )
+            else:
+                self._form = FormData()
+        return self._form
 
 
 class RoutingRequest(WSGIRequest):
@@ -32,8 +165,110 @@ class RoutingRequest(WSGIRequest):
         super().__init__(environ, app, context)
         self.endpoint = endpoint
 
+    def reset(self,
+              environ: Environ,
+              app: t.Optional[Application] = None,
+              context: t.Optional[t.Mapping[str, t.Any]] = None,
+              endpoint: t.Optional[MatchedRoute] = None):
+        super().reset(environ, app, context)
+        self.endpoint = endpoint
+
     @property
     def params(self) -> t.Optional[t.Mapping[str, t.Any]]:
         if self.endpoint:
             return self.endpoint.params
         return None
+
+
+class RequestPool:
+    """Per-thread pool of reusable requests, reducing the allocations
+    of each WSGI call. Opt-in: applications create their requests
+    through `serve`, or `acquire` then `bind`.
+
+    A request bound to a response is recycled when the response is
+    closed, only if nothing else holds a reference to it or to its
+    context: a request captured by a background task, a closure or a
+    traceback is left to the garbage collector. Recycling relies on
+    reference counting, calibrated through a response closing: it is
+    disabled if the counts do not reveal an escaped request.
+    """
+
+    def __init__(self, factory: t.Type[WSGIRequest] = RoutingRequest,
+                 size: int = 16):
+        self.factory = factory
+        self.size = size
+        self.local = threading.local()
+        self.expected = self.calibrate()
+
+    @property
+    def free(self) -> t.List[WSGIRequest]:
+        try:
+            return self.local.free
+        except AttributeError:
+            free = self.local.free = []
+            return free
+
+    def acquire(self, environ: Environ, **kwargs) -> WSGIRequest:
+        if free := self.free:
+            request = free.pop()
+            request.reset(environ, **kwargs)
+            return request
+        return self.factory(environ, **kwargs)
+
+    def references(self, request: WSGIRequest) -> t.Tuple[int, int]:
+        return sys.getrefcount(request), sys.getrefcount(request.context)
+
+    def measure(self, request: WSGIRequest, *args):
+        # Same frames as `recycle`, from the same finisher.
+        self.local.measured = self.references(request)
+
+    def probe(self, escape: bool) -> t.Tuple[int, int]:
+        request = self.factory({})
+        escaped = request if escape else None
+        response = Response(200, b'')
+        response.add_finisher(functools.partial(self.measure, request))
+        del request
+        response.close()
+        del escaped
+        return self.local.measured
+
+    def calibrate(self) -> t.Optional[t.Tuple[int, int]]:
+        """Counts the references held by the recycling machinery,
+        replaying a response closing with and without an escaped
+        request. Returns None if recycling cannot be made safe.
+        """
+        if not hasattr(sys, 'getrefcount'):
+            return None
+        clean, escaped = self.probe(False), self.probe(True)
+        if escaped[0] != clean[0] + 1:
+            Logger.warning(
+                'Escaped requests cannot be detected: '
+                'requests are not recycled.')
+            return None
+        return clean
+
+    def recycle(self, request: WSGIRequest, *args):
+        if self.expected is None:
+            return
+        if self.references(request) > self.expected:
+            # The request or its context escaped.
+            return
+        if len(free := self.free) < self.size:
+            free.append(request)
+
+    def bind(self, request: WSGIRequest, response):
+        """Recycles the request when the response is closed.
+        """
+        if isinstance(response, Response) and not isinstance(
+                response, FileResponse):
+            # Finishers would prevent the use of the file wrapper.
+            response.add_finisher(functools.partial(self.recycle, request))
+        return response
+
+    def serve(self, handler: t.Callable[[WSGIRequest], t.Any],
+              environ: Environ, **kwargs):
+        """Handles the environ with a pooled request. The request must
+        not be referenced by the caller once the response is returned.
+        """
+        request = self.acquire(environ, **kwargs)
+        return self.bind(request, handler(request))
@@ -1,10 +1,16 @@
+import os
 import typing as t
 import orjson
+import secrets
+import mimetypes
 from pathlib import Path
 from http import HTTPStatus
-from horseman.types import HTTPCode
+from horseman.types import HTTPCode, Environ, StartResponse
 from horseman.response import Headers, Response as BaseResponse
-from .utils import file_iterator
+from .utils import (
+    ByteRange, file_iterator, file_etag, http_date, parse_http_date,
+    etags_match, parse_ranges, json_array_chunks, ndjson_chunks
+)
 
 
 REDIRECT = frozenset((
@@ -18,9 +24,22 @@ REDIRECT = frozenset((
     HTTPStatus.PERMANENT_REDIRECT
 ))
 
+BODYLESS = frozenset((
+    HTTPStatus.NO_CONTENT,
+    HTTPStatus.NOT_MODIFIED
+))
+
+
+# Already serialized JSON, spliced unchanged into the output.
+JSONFragment = orjson.Fragment
+JSONDefault = t.Callable[[t.Any], t.Any]
+
 
 class Response(BaseResponse):
 
+    # Bodies made of chunks are joined up to this size.
+    coalesce_threshold: t.ClassVar[int] = 65536
+
     @classmethod
     def redirect(cls, location, code: HTTPCode = 303,
                  body: t.Optional[t.Iterable] = None,
@@ -45,19 +64,66 @@ class Response(BaseResponse):
         return cls(200, body, headers)
 
     @classmethod
-    def from_file_path(cls, path: Path):
-        return cls.from_file_iterator(file_iterator(path))
+    def from_file_path(cls, path: Path | str,
+                       filename: t.Optional[str] = None,
+                       headers: t.Optional[Headers] = None,
+                       chunk_size: int = 65536) -> 'FileResponse':
+        path = Path(path)
+        if filename is None:
+            filename = path.name
+        if headers is None:
+            headers = {}
+        if "Content-Disposition" not in headers:
+            headers["Content-Disposition"] = (
+                f"attachment;filename={filename}")
+        return FileResponse(path, headers=headers, chunk_size=chunk_size)
 
     @classmethod
     def to_json(cls, code: HTTPCode = 200, body: t.Optional[t.Any] = None,
-                headers: t.Optional[Headers] = None):
-        data = orjson.dumps(body)
+                headers: t.Optional[Headers] = None,
+                default: t.Optional[JSONDefault] = None,
+                option: t.Optional[int] = None):
+        """`default` and `option` are handed to `orjson.dumps`.
+        """
+        data = orjson.dumps(body, default=default, option=option)
         if headers is None:
             headers = {'Content-Type': 'application/json'}
         else:
             headers['Content-Type'] = 'application/json'
         return cls(code, data, headers)
 
+    @classmethod
+    def to_json_stream(cls, code: HTTPCode = 200,
+                       body: t.Iterable[t.Any] = (),
+                       headers: t.Optional[Headers] = None,
+                       batch: int = 500,
+                       default: t.Optional[JSONDefault] = None,
+                       option: t.Optional[int] = None):
+        """Streamed JSON array of the items of an iterable.
+        """
+        if headers is None:
+            headers = {'Content-Type': 'application/json'}
+        else:
+            headers['Content-Type'] = 'application/json'
+        return cls(code, json_array_chunks(
+            body, batch, default=default, option=option), headers)
+
+    @classmethod
+    def to_ndjson(cls, code: HTTPCode = 200,
+                  body: t.Iterable[t.Any] = (),
+                  headers: t.Optional[Headers] = None,
+                  batch: int = 500,
+                  default: t.Optional[JSONDefault] = None,
+                  option: t.Optional[int] = None):
+        """Streamed newline delimited JSON of the items of an iterable.
+        """
+        if headers is None:
+            headers = {'Content-Type': 'application/x-ndjson'}
+        else:
+            headers['Content-Type'] = 'application/x-ndjson'
+        return cls(code, ndjson_chunks(
+            body, batch, default=default, option=option), headers)
+
     @classmethod
     def from_json(cls, code: HTTPCode = 200, body: t.AnyStr = '',
                   headers: t.Optional[Headers] = None):
@@ -76,5 +142,183 @@ class Response(BaseResponse):
             headers['Content-Type'] = 'text/html; charset=utf-8'
         return cls(code, body, headers)
 
+    def prepare(self):
+        """Sets the Content-Length of the bodies of known size,
+        allowing keep-alive connections, and joins the small chunked
+        ones into a single buffer. Iterators are left streaming.
+        """
+        if self.status < 200 or self.status in BODYLESS:
+            return
+        if 'Content-Length' in self.headers or (
+                'Transfer-Encoding' in self.headers):
+            return
+        body = self.body
+        if body is None:
+            # The status description is sent.
+            length = len(self.status.description.encode())
+            self.headers.setdefault(
+                'Content-Type', 'text/plain; charset=utf-8')
+        elif isinstance(body, bytes):
+            length = len(body)
+        elif isinstance(body, str):
+            self.body = body = body.encode()
+            length = len(body)
+        elif isinstance(body, (list, tuple)):
+            chunks = []
+            for chunk in body:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                elif not isinstance(chunk, bytes):
+                    return
+                chunks.append(chunk)
+            length = sum(map(len, chunks))
+            if length <= self.coalesce_threshold:
+                self.body = b''.join(chunks)
+            else:
+                self.body = chunks
+        else:
+            return
+        self.headers['Content-Length'] = str(length)
+
+    def __call__(self, environ: Environ,
+                 start_response: StartResponse) -> t.Iterable[bytes]:
+        self.prepare()
+        return super().__call__(environ, start_response)
+
+
+class FileResponse(Response):
+    """Response serving a file from the disk.
+    The open file is handed to the server's `wsgi.file_wrapper`, when
+    available, allowing zero-copy transmission (sendfile). Otherwise,
+    the file is streamed by chunks of `chunk_size` bytes.
+
+    Conditional (`If-None-Match`, `If-Modified-Since`) and range
+    (`Range`, `If-Range`) requests are honored when the response is
+    called, with validators derived from the file metadata.
+    """
+
+    path: Path
+    chunk_size: int
+    max_ranges: int = 16  # More ranges than this are served whole.
+
+    def __init__(self, path: Path,
+                 code: HTTPCode = 200,
+                 headers: t.Optional[Headers] = None,
+                 chunk_size: int = 65536,
+                 stat: t.Optional[os.stat_result] = None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.stat = stat if stat is not None else path.stat()
+        super().__init__(code, file_iterator(path, chunk_size), headers)
+        if 'Content-Type' not in self.headers:
+            content_type, _ = mimetypes.guess_type(path.name)
+            self.headers['Content-Type'] = (
+                content_type or 'application/octet-stream')
+        self.headers['Content-Length'] = str(self.stat.st_size)
+        self.headers['Accept-Ranges'] = 'bytes'
+        if 'ETag' not in self.headers:
+            self.headers['ETag'] = file_etag(self.stat)
+        if 'Last-Modified' not in self.headers:
+            self.headers['Last-Modified'] = http_date(self.stat.st_mtime)
+
+    def not_modified(self, environ: Environ) -> bool:
+        if (none_match := environ.get('HTTP_IF_NONE_MATCH')) is not None:
+            return etags_match(none_match, self.headers['ETag'])
+        if since := environ.get('HTTP_IF_MODIFIED_SINCE'):
+            timestamp = parse_http_date(since)
+            return timestamp is not None and (
+                int(self.stat.st_mtime) <= timestamp)
+        return False
+
+    def if_range(self, environ: Environ) -> bool:
+        if (value := environ.get('HTTP_IF_RANGE')) is None:
+            return True
+        if value.startswith(('"', 'W/')):
+            return etags_match(value, self.headers['ETag'], weak=False)
+        return parse_http_date(value) == int(self.stat.st_mtime)
+
+    def conditional(self, environ: Environ):
+        """Turn the response into a 304, 206 or 416 response,
+        according to the request headers.
+        """
+        if self.status != HTTPStatus.OK or environ.get(
+                'REQUEST_METHOD', 'GET') not in ('GET', 'HEAD'):
+            return
+
+        if self.not_modified(environ):
+            self.status = HTTPStatus.NOT_MODIFIED
+            self.body = None
+            for name in ('Content-Type', 'Content-Length', 'Accept-Ranges'):
+                self.headers.pop(name, None)
+            return
+
+        if (header := environ.get('HTTP_RANGE')) is None or (
+                not self.if_range(environ)):
+            return
+
+        size = self.stat.st_size
+        ranges = parse_ranges(header, size)
+        if ranges is None or len(ranges) > self.max_ranges:
+            return
+        if not ranges:
+            self.status = HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+            self.body = b''
+            self.headers['Content-Range'] = f'bytes */{size}'
+            self.headers['Content-Length'] = '0'
+            return
+
+        self.status = HTTPStatus.PARTIAL_CONTENT
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self.body = file_iterator(
+                self.path, self.chunk_size, start, end - start + 1)
+            self.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            self.headers['Content-Length'] = str(end - start + 1)
+        else:
+            boundary = secrets.token_hex(16)
+            self.body, length = self.byteranges(ranges, boundary)
+            self.headers['Content-Type'] = (
+                f'multipart/byteranges; boundary={boundary}')
+            self.headers['Content-Length'] = str(length)
+
+    def byteranges(self, ranges: t.Sequence[ByteRange], boundary: str
+                   ) -> t.Tuple[t.Iterator[bytes], int]:
+        size = self.stat.st_size
+        content_type = self.headers['Content-Type']
+        heads = [
+            (f'--{boundary}\r\n'
+             f'Content-Type: {content_type}\r\n'
+             f'Content-Range: bytes {start}-{end}/{size}\r\n'
+             '\r\n').encode('latin-1')
+            for start, end in ranges
+        ]
+        tail = f'--{boundary}--\r\n'.encode('latin-1')
+        length = len(tail) + sum(
+            len(head) + (end - start + 1) + 2
+            for head, (start, end) in zip(heads, ranges)
+        )
+
+        def parts():
+            for head, (start, end) in zip(heads, ranges):
+                yield head
+                yield from file_iterator(
+                    self.path, self.chunk_size, start, end - start + 1)
+                yield b'\r\n'
+            yield tail
+
+        return parts(), length
+
+    def __call__(self, environ: Environ,
+                 start_response: StartResponse) -> t.Iterable[bytes]:
+        self.conditional(environ)
+        wrapper = environ.get('wsgi.file_wrapper')
+        if wrapper is None or self._finishers or (
+                self.status != HTTPStatus.OK):
+            # Partial content is streamed and the file wrapper would
+            # bypass our own closing.
+            return super().__call__(environ, start_response)
+        super().__call__(environ, start_response)
+        return wrapper(open(self.path, 'rb'), self.chunk_size)
+
 
-__all__ = ('Response',)
+__all__ = ('Response', 'FileResponse', 'JSONFragment')
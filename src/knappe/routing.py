@@ -16,6 +16,54 @@ METHODS = frozenset(t.get_args(HTTPMethod))
 HTTPMethods = t.Iterable[HTTPMethod]
 
 
+class PathMatcher:
+    """Compiled collection of path patterns.
+    Patterns can be exact (`/login`), prefixes (`/static/*`) or
+    contain placeholders (`/users/{id}/edit`). Exact paths are kept
+    in a set, the others are compiled in a single routes trie.
+    """
+
+    __slots__ = ('patterns', '_static', '_routes')
+
+    patterns: t.Tuple[str, ...]
+    _static: t.FrozenSet[str]
+    _routes: t.Optional[autoroutes.Routes]
+
+    def __init__(self, patterns: t.Iterable[str] = ()):
+        self.patterns = tuple(patterns)
+        static = set()
+        self._routes = None
+        for pattern in self.patterns:
+            if pattern.endswith('*'):
+                pattern = pattern[:-1] + '{__tail__:path}'
+            if '{' in pattern:
+                if self._routes is None:
+                    self._routes = autoroutes.Routes()
+                self._routes.add(pattern, matched=True)
+            else:
+                static.add(pattern)
+        self._static = frozenset(static)
+
+    def __contains__(self, path: str) -> bool:
+        if path in self._static:
+            return True
+        if self._routes is not None:
+            found, _ = self._routes.match(path)
+            return found is not None
+        return False
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def __or__(self, other: 'PathMatcher'):
+        if not isinstance(other, PathMatcher):
+            raise TypeError(
+                f"Unsupported merge between {self.__class__!r} "
+                f"and {other.__class__!r}"
+            )
+        return self.__class__((*self.patterns, *other.patterns))
+
+
 @dispatch
 def as_routable(view: t.Type[APIView], methods: t.Optional[HTTPMethods]):
     inst = view()
@@ -123,7 +171,7 @@ class Router(RouteStore):
 
     def __ior__(self, other):
         for key, route in other.items():
-            self.routes.add(route.path, **{route.method: route})
+            self[key] = route
         return self
 
     def match(self,
@@ -0,0 +1,156 @@
+import os
+import hashlib
+import mimetypes
+import typing as t
+from dataclasses import dataclass, replace
+from pathlib import Path
+from knappe.middlewares.compression import accepted_encodings
+from knappe.response import Response, FileResponse
+from knappe.request import RoutingRequest
+from knappe.utils import file_etag, http_date, etags_match
+
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+@dataclass(frozen=True)
+class Asset:
+    path: Path
+    stat: os.stat_result
+    content_type: str
+    etag: str
+    last_modified: str
+    data: t.Optional[bytes] = None  # In-memory content of small files.
+    gzipped: t.Optional['Asset'] = None  # Precompressed variant.
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+
+def fingerprint(path: Path, length: int = 12) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as reader:
+        while chunk := reader.read(65536):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+class StaticFiles:
+    """Static resources endpoint.
+
+    The directory is indexed once: metadata is precomputed and the
+    files smaller than `memory_threshold` are kept in memory. A `.gz`
+    sibling is served, compressed, to the clients accepting it, and is
+    not reachable on its own.
+    Each file is also reachable through a fingerprinted name,
+    (`app.3f2a9c01d4e5.css`) served with a long-lived immutable cache
+    policy. Use `url` to get it.
+    """
+
+    assets: t.Dict[str, Asset]
+    fingerprinted: t.Dict[str, str]
+
+    def __init__(self,
+                 root: Path | str,
+                 prefix: str = '/static',
+                 memory_threshold: int = 65536,
+                 max_age: int = 3600,
+                 chunk_size: int = 65536):
+        self.root = Path(root)
+        self.prefix = prefix.rstrip('/')
+        self.memory_threshold = memory_threshold
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self.index()
+
+    def asset(self, path: Path, content_type: str) -> Asset:
+        stat = path.stat()
+        data = None
+        if stat.st_size <= self.memory_threshold:
+            data = path.read_bytes()
+        return Asset(
+            path=path,
+            stat=stat,
+            content_type=content_type,
+            etag=file_etag(stat),
+            last_modified=http_date(stat.st_mtime),
+            data=data
+        )
+
+    def index(self):
+        assets = {}
+        fingerprinted = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.gz') and filename[:-3] in filenames:
+                    continue  # Attached to its source as `gzipped`.
+                path = Path(dirpath) / filename
+                name = path.relative_to(self.root).as_posix()
+                content_type, _ = mimetypes.guess_type(filename)
+                content_type = content_type or 'application/octet-stream'
+                asset = self.asset(path, content_type)
+                gzipped = path.with_name(filename + '.gz')
+                if gzipped.is_file():
+                    asset = replace(
+                        asset, gzipped=self.asset(gzipped, content_type))
+                assets[name] = asset
+                stem, dot, suffix = name.rpartition('.')
+                if dot and '/' not in suffix:
+                    fingerprinted[
+                        f'{stem}.{fingerprint(path)}.{suffix}'] = name
+                else:
+                    fingerprinted[f'{name}.{fingerprint(path)}'] = name
+        self.assets = assets
+        self.fingerprinted = fingerprinted
+        self.urls = {name: fp for fp, name in fingerprinted.items()}
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL of the asset, relative to the application.
+        """
+        return f'{self.prefix}/{self.urls[name]}'
+
+    def mount(self, router, name: str = 'static'):
+        path = f'{self.prefix}/{{filepath:path}}'
+        router.create(self, path, method='GET', name=name)
+        router.create(self, path, method='HEAD')
+        return self  # for chaining
+
+    def __call__(self, request: RoutingRequest) -> Response:
+        name = request.params['filepath']
+        if immutable := name in self.fingerprinted:
+            name = self.fingerprinted[name]
+        if (asset := self.assets.get(name)) is None:
+            return Response(404)
+
+        headers = {
+            'Cache-Control': (
+                IMMUTABLE if immutable else f'public, max-age={self.max_age}'
+            )
+        }
+        if asset.gzipped is not None:
+            headers['Vary'] = 'Accept-Encoding'
+            accepted = accepted_encodings(
+                request.get('HTTP_ACCEPT_ENCODING', ''))
+            if accepted.get('gzip', accepted.get('*', 0.0)) > 0:
+                asset = asset.gzipped
+                headers['Content-Encoding'] = 'gzip'
+
+        headers['ETag'] = asset.etag
+        headers['Last-Modified'] = asset.last_modified
+        if (none_match := request.get('HTTP_IF_NONE_MATCH')) is not None:
+            if etags_match(none_match, asset.etag):
+                # A 304 has no body: it is not encoded.
+                headers.pop('Content-Encoding', None)
+                return Response(304, headers=headers)
+
+        headers['Content-Type'] = asset.content_type
+        if asset.data is not None:
+            headers['Content-Length'] = str(asset.size)
+            return Response(200, asset.data, headers)
+        return FileResponse(
+            asset.path,
+            headers=headers,
+            chunk_size=self.chunk_size,
+            stat=asset.stat
+        )
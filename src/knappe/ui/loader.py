@@ -0,0 +1,152 @@
+import os
+import hashlib
+import logging
+import typing as t
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from chameleon.loader import ModuleLoader
+from chameleon.zpt import template
+
+
+Logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def module_version(module: str) -> str:
+    """Version of the distributions providing a module, if any.
+    """
+    top = module.partition('.')[0]
+    versions = []
+    for name in metadata.packages_distributions().get(top, ()):
+        try:
+            versions.append(f'{name}-{metadata.version(name)}')
+        except metadata.PackageNotFoundError:
+            continue
+    return ','.join(sorted(versions))
+
+
+def expression_types_key(
+        expression_types: t.Mapping[str, t.Callable]) -> str:
+    # Versions are included: upgraded expression compilers change
+    # the compiled code without changing their names.
+    digest = hashlib.sha1(module_version(__name__).encode())
+    for name, factory in sorted(expression_types.items()):
+        digest.update(
+            f'{name}={factory.__module__}.{factory.__qualname__}'
+            f'@{module_version(factory.__module__)};'.encode())
+    return digest.hexdigest()[:12]
+
+
+class ContentDigest:
+    """Digests a template file from its content, class, options and
+    the Chameleon version only. Chameleon includes the absolute path
+    of the file: the same template in another directory, such as a
+    new release, would be compiled again. In `debug` mode, the path
+    is part of the digest, for the tracebacks to point to the file.
+    """
+
+    def digest(self, body: str, names: t.Collection[str]) -> str:
+        sha = hashlib.sha256(module_version('chameleon').encode())
+        sha.update(
+            f'{type(self).__module__}.{type(self).__qualname__};'.encode())
+        sha.update(body.encode('utf-8', 'ignore'))
+        sha.update(';'.join(names).encode('utf-8'))
+        for attr in (
+                'trim_attribute_space', 'implicit_i18n_translate', 'strict'):
+            sha.update(f';{attr}={getattr(self, attr, None)}'.encode())
+        if self.debug:
+            sha.update(f';{self.filename}'.encode())
+        return sha.hexdigest()[:32]
+
+
+class PageTemplateFile(ContentDigest, template.PageTemplateFile):
+    pass
+
+
+class PageTextTemplateFile(ContentDigest, template.PageTextTemplateFile):
+    pass
+
+
+class TemplateCache(ModuleLoader):
+    """Persistent cache of compiled templates, shared by processes.
+
+    Entries are addressed by the digest of the template, covering its
+    content, class and the Chameleon version (see `ContentDigest`),
+    and by the registered expression types and their versions: moving
+    or redeploying unchanged templates reuses their compiled modules.
+    Modules are written to a temporary file then renamed, so
+    concurrent writers never expose a partial module. Least recently
+    used entries are pruned when the cache exceeds `max_size` bytes.
+
+    Chameleon writes the absolute path of the template in the compiled
+    module (`__filename`): a module compiled for a former release keeps
+    its path, which then shows in the error tracebacks of the templates
+    of the next releases. Enable the Chameleon `debug` option to key
+    the modules by path as well.
+    """
+
+    def __init__(self, path: Path | str,
+                 expression_types: t.Mapping[str, t.Callable],
+                 max_size: t.Optional[int] = None):
+        Path(path).mkdir(parents=True, exist_ok=True)
+        super().__init__(str(path), remove=False)
+        self.expression_types = expression_types
+        self.max_size = max_size
+
+    def key(self, filename: str) -> str:
+        base, ext = os.path.splitext(filename)
+        return f'{base}_{expression_types_key(self.expression_types)}{ext}'
+
+    def get(self, filename: str) -> t.Optional[t.Dict[str, t.Any]]:
+        filename = self.key(filename)
+        try:
+            module = super().get(filename)
+        except OSError:
+            # Pruned by another process while loading.
+            return None
+        if module is not None:
+            try:
+                os.utime(os.path.join(self.path, filename))
+            except OSError:
+                pass
+        return module
+
+    def build(self, source: str, filename: str) -> t.Dict[str, t.Any]:
+        module = super().build(source, self.key(filename))
+        if self.max_size is not None:
+            self.prune(self.max_size)
+        return module
+
+    def entries(self) -> t.Iterator[t.Tuple[float, int, t.List[Path]]]:
+        """Yields the last use, size and files of each cached module.
+        """
+        root = Path(self.path)
+        for module in root.glob('*.py'):
+            files = [module, *(root / '__pycache__').glob(
+                f'{module.stem}.*.pyc')]
+            try:
+                size = sum(path.stat().st_size for path in files)
+                yield module.stat().st_mtime, size, files
+            except FileNotFoundError:
+                continue
+
+    def prune(self, max_size: int) -> int:
+        """Removes the least recently used modules until the cache
+        fits in `max_size` bytes. Returns the number of freed bytes.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, files in entries:
+            if total - freed <= max_size:
+                break
+            for path in files:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            freed += size
+        if freed:
+            Logger.info('Pruned %d bytes of compiled templates.', freed)
+        return freed
@@ -1,12 +1,20 @@
+import time
 import inspect
+import logging
+import threading
 import typing as t
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from types import MappingProxyType
 from chameleon.zpt import template
 from pkg_resources import resource_filename
 from knappe.collections import PriorityChain
+from knappe.ui.loader import (
+    TemplateCache, PageTemplateFile, PageTextTemplateFile)
 
 
+Logger = logging.getLogger(__name__)
 EXPRESSION_TYPES: t.Mapping[str, t.Callable[[str], t.Callable]] = {}
 
 
@@ -18,21 +26,124 @@ def scan_templates(path: Path, allowed_suffixes=(".pt", ".cpt")):
             yield child
 
 
+def compile_template(factory: t.Type[template.PageTemplateFile],
+                     path: Path,
+                     expression_types: t.Mapping[str, t.Callable],
+                     cache_directory: str) -> float:
+    """Compiles a template into the cache directory, in a worker
+    process. Returns the compile time, in seconds.
+    """
+    start = time.perf_counter()
+    tpl = factory(path)
+    tpl.expression_types = {**tpl.expression_types, **expression_types}
+    tpl.loader = TemplateCache(cache_directory, expression_types)
+    tpl.cook_check()
+    return time.perf_counter() - start
+
+
+def mtime(path: Path) -> t.Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class TemplateEntry:
+    """A registered template file and, once loaded, its compiled
+    template. Entries are shared by the merged templates: a file is
+    compiled once, whatever the layer it is looked up from.
+    """
+
+    __slots__ = ('path', 'template', 'mtime', 'lock')
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.template: t.Optional[template.PageTemplate] = None
+        self.mtime: t.Optional[int] = None  # When loaded, if reloading.
+        self.lock = threading.Lock()
+
+
+class EntriesView(t.Mapping[str, t.Any]):
+    """Read-only view of an attribute of the template entries,
+    skipping the entries where it is not set.
+    """
+
+    __slots__ = ('entries', 'attr')
+
+    def __init__(self, entries: t.Mapping[str, TemplateEntry], attr: str):
+        self.entries = entries
+        self.attr = attr
+
+    def __getitem__(self, name: str) -> t.Any:
+        if (value := getattr(self.entries[name], self.attr)) is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self) -> t.Iterator[str]:
+        for name, entry in tuple(self.entries.items()):
+            if getattr(entry, self.attr) is not None:
+                yield name
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
 class Templates(t.Mapping[str, template.PageTemplate]):
 
-    registry: t.MutableMapping[str, Path]
-    cache: t.MutableMapping[str, template.PageTemplate]
+    entries: t.Dict[str, TemplateEntry]
     extensions = {
-        ".pt": template.PageTemplateFile,
-        ".cpt": template.PageTemplateFile,
-        ".txt": template.PageTextTemplateFile,
+        ".pt": PageTemplateFile,
+        ".cpt": PageTemplateFile,
+        ".txt": PageTextTemplateFile,
     }
     expression_types = MappingProxyType(EXPRESSION_TYPES)
 
-    def __init__(self, prefix: str | None = None):
-        self.registry = {}
-        self.cache = {}
+    def __init__(self, prefix: str | None = None,
+                 cache_directory: Path | str | None = None,
+                 cache_size: int | None = None,
+                 reload_interval: float | None = None):
+        self.entries = {}
+        self.chains = weakref.WeakSet()  # Indexes to invalidate on change.
         self.prefix = prefix
+        # Opt-in: compiled templates are stored on the disk and reused
+        # across processes. Otherwise, Chameleon's own loader is used.
+        self.cache_directory = cache_directory
+        self.cache_size = cache_size
+        self.loader = TemplateCache(
+            cache_directory, self.expression_types, cache_size
+        ) if cache_directory else None
+        self.version = 0  # Incremented on change, to invalidate lookups.
+        # Seconds between checks of the template files, when reloading
+        # edited templates. Disabled if None.
+        self.reload_interval = reload_interval
+        self.next_check = 0.0
+        self.checking = threading.Lock()
+
+    @property
+    def registry(self) -> t.Mapping[str, Path]:
+        """Read-only paths of the templates, by name.
+        """
+        return EntriesView(self.entries, 'path')
+
+    @property
+    def cache(self) -> t.Mapping[str, template.PageTemplate]:
+        """Read-only compiled templates, by name. See `invalidate`.
+        """
+        return EntriesView(self.entries, 'template')
+
+    def changed(self):
+        self.version += 1
+        for chain in tuple(self.chains):
+            chain.invalidate()
+
+    def invalidate(self, *names: str):
+        """Drops the compiled templates, all of them if no name is
+        given. They are shared with the merged templates.
+        """
+        for name in names or tuple(self.entries):
+            entry = self.entries[name]
+            entry.template = entry.mtime = None
+        self.version += 1
 
     def register_package_resources(self, pkgpath: str):
         pkg, resource_name = pkgpath.split(":", 1)
@@ -50,17 +161,18 @@ class Templates(t.Mapping[str, template.PageTemplate]):
 
         for tpl in scan_templates(path, tuple(self.extensions.keys())):
             name = str(tpl.relative_to(path).with_suffix('').as_posix())
-            if conflict := self.registry.get(name):
+            if conflict := self.entries.get(name):
                 raise KeyError(
-                    f'{name!r} exists: {tpl!r} overrides {conflict!r}.')
-            self.registry[f'{self.prefix or ""}{name}'] = tpl
+                    f'{name!r} exists: {tpl!r} overrides {conflict.path!r}.')
+            self.entries[f'{self.prefix or ""}{name}'] = TemplateEntry(tpl)
+        self.changed()
         return self  # for chaining
 
     def __iter__(self):
-        return iter(self.registry)
+        return iter(self.entries)
 
     def __len__(self):
-        return len(self.registry)
+        return len(self.entries)
 
     def __lt__(self, other: 'Templates'):
         return tuple(self.keys()) < tuple(self.keys())
@@ -69,40 +181,180 @@ class Templates(t.Mapping[str, template.PageTemplate]):
         return self[name].macros[macroname]
 
     def __getitem__(self, name):
-        if tpl := self.cache.get(name):
-            return tpl
+        if self.reload_interval is not None:
+            self.refresh()
+
+        if (entry := self.entries.get(name)) is None:
+            raise KeyError(f"Template not found: {name}.")
+        return entry.template or self.compile(entry)
+
+    def compile(self, entry: TemplateEntry) -> template.PageTemplate:
+        # Concurrent misses wait for a single compilation.
+        with entry.lock:
+            if entry.template is None:
+                if self.reload_interval is not None:
+                    # Before loading: an edit while compiling is not missed.
+                    entry.mtime = mtime(entry.path)
+                tpl = self.load(entry.path)
+                tpl.cook_check()
+                entry.template = tpl
+            return entry.template
+
+    def refresh(self, force: bool = False) -> t.List[str]:
+        """Evicts the compiled templates whose file changed since they
+        were loaded, at most once per `reload_interval`.
+        Returns the names of the evicted templates.
+        """
+        if not force and time.monotonic() < self.next_check:
+            return []
+        if not self.checking.acquire(blocking=False):
+            return []  # Another thread is sweeping.
+        try:
+            self.next_check = time.monotonic() + (self.reload_interval or 0)
+            changed = [
+                (name, entry) for name, entry in tuple(self.entries.items())
+                if entry.template is not None
+                and mtime(entry.path) != entry.mtime
+            ]
+            for name, entry in changed:
+                entry.template = entry.mtime = None
+            if changed:
+                self.version += 1
+                Logger.info('Reloading edited templates: %s.',
+                            [name for name, _ in changed])
+            return [name for name, _ in changed]
+        finally:
+            self.checking.release()
+
+    def load(self, path: Path) -> template.PageTemplateFile:
+        factory = self.extensions[path.suffix]
+        tpl = factory(path)
+        tpl.expression_types |= self.expression_types
+        if self.loader is not None:
+            tpl.loader = self.loader
+        return tpl
 
-        if path := self.registry.get(name):
-            factory = self.extensions[path.suffix]
-            tpl = self.cache[name] = factory(path)
-            tpl.expression_types |= self.expression_types
-            return tpl
+    def warmup(self, processes: int = 0) -> t.Dict[str, float]:
+        """Compiles the registered templates ahead of their first use.
+        Returns the compile time of each template, in seconds.
 
-        raise KeyError(f"Template not found: {name}.")
+        With `processes`, the templates are compiled by a pool of
+        worker processes into the cache directory, then loaded from it.
+        """
+        timings = {}
+        if processes and not (cache_directory := self.cache_directory):
+            Logger.warning(
+                'Compiling in worker processes requires a cache '
+                'directory: templates are compiled in process.')
+        elif processes and len(self.entries) > 1:
+            with ProcessPoolExecutor(processes) as pool:
+                futures = {
+                    name: pool.submit(
+                        compile_template,
+                        self.extensions[entry.path.suffix],
+                        entry.path,
+                        dict(self.expression_types),
+                        str(cache_directory)
+                    )
+                    for name, entry in self.entries.items()
+                    if entry.template is None
+                }
+                for name, future in futures.items():
+                    timings[name] = future.result()
+
+        for name in self.entries:
+            start = time.perf_counter()
+            self[name].cook_check()
+            timings.setdefault(name, time.perf_counter() - start)
+            Logger.debug(
+                'Template %r compiled in %.4fs.', name, timings[name])
+        return timings
 
     def __or__(self, reg: 'Templates'):
         if not isinstance(reg, Templates):
             raise TypeError(
                 f'Cannot merge {self.__class__!r} with {reg.__class__!r}.')
-        templates = self.__class__()
-        templates.registry = self.registry | reg.registry
-        # ensure cache consistency. Merged cache should have precedence on merged overriding templates
-        templates.cache = {p: t for p, t in self.cache.items() if p not in reg.registry} | reg.cache
+        if reg.cache_directory:
+            templates = self.__class__(
+                cache_directory=reg.cache_directory,
+                cache_size=reg.cache_size
+            )
+        else:
+            templates = self.__class__(
+                cache_directory=self.cache_directory,
+                cache_size=self.cache_size
+            )
+        if reg.reload_interval is not None:
+            templates.reload_interval = reg.reload_interval
+        else:
+            templates.reload_interval = self.reload_interval
+        # Entries are shared: compiled templates are reused by both.
+        templates.entries = self.entries | reg.entries
         return templates
 
     def __ior__(self, reg: 'Templates'):
-        return self | reg
+        """Merges in place, at the cost of the merged entries only.
+        The configuration of these templates is kept.
+        """
+        if not isinstance(reg, Templates):
+            raise TypeError(
+                f'Cannot merge {self.__class__!r} with {reg.__class__!r}.')
+        self.entries.update(reg.entries)
+        if self.reload_interval is None:
+            self.reload_interval = reg.reload_interval
+        self.changed()
+        return self
 
 
 class TemplatesChain(PriorityChain[t.Tuple[int, Templates]]):
+    """Templates by priority. Names are resolved through an index of
+    the winning entries, rebuilt when the chain or a layer changes.
+    """
+
+    __slots__ = ('_index', '__weakref__')
+
+    _index: t.Optional[t.Dict[str, t.Tuple[Templates, TemplateEntry]]]
+
+    def __init__(self, *items: t.Tuple[int, Templates]):
+        super().__init__(*items)
+        self._index = None
+        for order, registry in self._chain:
+            registry.chains.add(self)
 
     def register(self, registry: Templates, order: int = 0):
         return self.add((order, registry))
+
+    def add(self, sortable: t.Tuple[int, Templates]):
+        super().add(sortable)
+        sortable[1].chains.add(self)
+        self._index = None
+
+    def remove(self, sortable: t.Tuple[int, Templates]):
+        super().remove(sortable)
+        self._index = None
+
+    def clear(self):
+        super().clear()
+        self._index = None
+
+    def invalidate(self):
+        self._index = None
+
+    def index(self) -> t.Dict[str, t.Tuple[Templates, TemplateEntry]]:
+        index = {}
+        for order, registry in reversed(self._chain):
+            index.update(
+                (name, (registry, entry))
+                for name, entry in registry.entries.items()
+            )
+        return index
+
     def get(self, name):
-        for order, reg in self._chain:
-            try:
-               tpl = reg[name]
-               return tpl
-            except KeyError:
-                continue
-        return None
+        if (index := self._index) is None:
+            index = self._index = self.index()
+        if (found := index.get(name)) is None:
+            return None
+        registry, entry = found
+        if registry.reload_interval is not None:
+            registry.refresh()
+        return entry.template or registry.compile(entry)
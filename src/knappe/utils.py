@@ -1,11 +1,159 @@
+import os
+import orjson
 import typing as t
 from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
 
 
-def file_iterator(path: Path, chunk: int = 4096) -> t.Iterator[bytes]:
-    with path.open('rb') as reader:
-        while True:
-            data = reader.read(chunk)
-            if not data:
+ByteRange = t.Tuple[int, int]  # first and last byte positions, inclusive.
+
+
+def file_iterator(path: Path, chunk: int = 65536,
+                  offset: int = 0, length: t.Optional[int] = None
+                  ) -> t.Iterator[bytes]:
+    """Read the file by chunks, into a single reusable buffer,
+    bypassing the Python-level buffering.
+    """
+    buffer = bytearray(chunk)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as reader:
+        if offset:
+            reader.seek(offset)
+        remaining = length
+        while remaining is None or remaining > 0:
+            if remaining is not None and remaining < chunk:
+                read = reader.readinto(view[:remaining])
+            else:
+                read = reader.readinto(buffer)
+            if not read:
                 break
-            yield data
+            if remaining is not None:
+                remaining -= read
+            yield bytes(view[:read])
+
+
+def json_array_chunks(items: t.Iterable[t.Any], batch: int = 500,
+                      default: t.Optional[t.Callable] = None,
+                      option: t.Optional[int] = None) -> t.Iterator[bytes]:
+    """Serialize the items as a JSON array, by batches of items.
+    The opening bracket is yielded right away.
+    """
+    yield b'['
+    buffer = []
+    separator = b''
+    for item in items:
+        buffer.append(orjson.dumps(item, default=default, option=option))
+        if len(buffer) >= batch:
+            yield separator + b','.join(buffer)
+            buffer.clear()
+            separator = b','
+    if buffer:
+        yield separator + b','.join(buffer) + b']'
+    else:
+        yield b']'
+
+
+def ndjson_chunks(items: t.Iterable[t.Any], batch: int = 500,
+                  default: t.Optional[t.Callable] = None,
+                  option: t.Optional[int] = None) -> t.Iterator[bytes]:
+    """Serialize the items as newline delimited JSON, by batches.
+    """
+    option = (option or 0) | orjson.OPT_APPEND_NEWLINE
+    buffer = []
+    for item in items:
+        buffer.append(orjson.dumps(item, default=default, option=option))
+        if len(buffer) >= batch:
+            yield b''.join(buffer)
+            buffer.clear()
+    if buffer:
+        yield b''.join(buffer)
+
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str) -> t.Optional[int]:
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def etags_match(header: str, etag: str, weak: bool = True) -> bool:
+    """Match an ETag against an If-Match or If-None-Match header.
+    The weak comparison ignores the `W/` prefixes.
+    """
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if weak:
+            if candidate.removeprefix('W/') == etag.removeprefix('W/'):
+                return True
+        elif candidate == etag and not etag.startswith('W/'):
+            return True
+    return False
+
+
+def parse_accept(header: str) -> t.Tuple[t.Tuple[str, float], ...]:
+    """Parse an `Accept` header into (mimetype, quality) couples,
+    by decreasing quality. The order of equal qualities is kept.
+    """
+    accepted = []
+    for item in header.split(','):
+        mimetype, *params = item.split(';')
+        if not (mimetype := mimetype.strip().lower()):
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted.append((mimetype, quality))
+    accepted.sort(key=lambda accept: -accept[1])
+    return tuple(accepted)
+
+
+def parse_ranges(header: str, size: int) -> t.Optional[t.List[ByteRange]]:
+    """Parse a `Range` header against a resource of the given size.
+    Returns None if the header is invalid and must be ignored, or the
+    list of satisfiable ranges, empty if none is.
+    """
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs.strip():
+        return None
+    ranges = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, sep, last = spec.partition('-')
+        first, last = first.strip(), last.strip()
+        if not sep or (first and not first.isdigit()) or (
+                last and not last.isdigit()):
+            return None
+        if not first:
+            if not last:
+                return None
+            suffix = int(last)
+            if suffix and size:
+                ranges.append((max(size - suffix, 0), size - 1))
+        else:
+            start = int(first)
+            if last:
+                end = int(last)
+                if end < start:
+                    return None
+            else:
+                end = size - 1
+            if start < size:
+                ranges.append((start, min(end, size - 1)))
+    return ranges
@@ -3,8 +3,9 @@ from knappe.request import WSGIRequest
 from knappe.fixtures.auth import DictSource, UserObject
 from knappe.auth import WSGISessionAuthenticator
 from knappe.middlewares.session import HTTPSession
+from knappe.routing import PathMatcher
 from knappe.middlewares.auth import (
-    Authentication, security_bypass, secured, TwoFA)
+    Authentication, Bypass, security_bypass, secured, TwoFA)
 
 
 def test_auth(environ, http_session_store):
@@ -105,14 +106,69 @@ def test_security_bypass_filter(environ):
     def handler(request):
         return Response(201)
 
-    request = WSGIRequest(environ)
+    request = WSGIRequest({**environ, 'PATH_INFO': '/login'})
     response = security_bypass('/login')(handler, request)
     assert response.status == 201
 
+    request = WSGIRequest(environ)
+    response = security_bypass('/login')(handler, request)
+    assert response is None
+
     request = WSGIRequest({**environ, 'PATH_INFO': '/test'})
     response = security_bypass('/login')(handler, request)
     assert response is None
 
+    request = WSGIRequest({**environ, 'PATH_INFO': '/static/app.css'})
+    response = security_bypass(
+        ['/login', '/logout'], '/static/*')(handler, request)
+    assert response.status == 201
+
+
+def test_path_matcher():
+    matcher = PathMatcher(['/login', '/static/*', '/users/{id}/avatar'])
+    assert '/login' in matcher
+    assert '/login/' not in matcher
+    assert '/static/' in matcher
+    assert '/static/css/app.css' in matcher
+    assert '/static' not in matcher
+    assert '/users/1/avatar' in matcher
+    assert '/users/1' not in matcher
+    assert '/' not in matcher
+
+    merged = PathMatcher(['/login']) | PathMatcher(['/public/*'])
+    assert merged.patterns == ('/login', '/public/*')
+    assert '/public/index.html' in merged
+
+
+def test_compiled_filters(environ):
+
+    def handler(request):
+        return Response(201)
+
+    authentication: Authentication[WSGIRequest, Response] = Authentication(
+        authenticator=WSGISessionAuthenticator([
+            DictSource({'admin': 'admin'}),
+        ]),
+        filters=[
+            security_bypass('/login'),
+            security_bypass('/static/*'),
+            secured('/login')
+        ]
+    )
+    assert len(authentication.filters) == 2
+    assert isinstance(authentication.filters[0], Bypass)
+    assert authentication.filters[0].unprotected.patterns == (
+        '/login', '/static/*')
+
+    request = WSGIRequest({**environ, 'PATH_INFO': '/static/app.js'})
+    response = authentication(handler)(request)
+    assert response.status == 201
+
+    request = WSGIRequest({**environ, 'PATH_INFO': '/private'})
+    response = authentication(handler)(request)
+    assert response.status == 303
+    assert response.headers['Location'] == '/login'
+
 
 def test_twoFA_filter(environ):
 
@@ -135,3 +191,41 @@ def test_twoFA_filter(environ):
     request.context['twoFA'] = True
     response = TwoFA('/sms_qr_code', twofa_checker)(handler, request)
     assert response is None
+
+
+def test_compiled_twoFA_filter(environ):
+
+    def twofa_checker(request):
+        return request.context.get('twoFA', False)
+
+    def handler(request):
+        return Response(201)
+
+    authentication: Authentication[WSGIRequest, Response] = Authentication(
+        authenticator=WSGISessionAuthenticator([
+            DictSource({'admin': 'admin'}),
+        ]),
+        filters=[
+            security_bypass('/login'),
+            TwoFA('/sms_qr_code', twofa_checker),
+            secured('/login')
+        ]
+    )
+    # The bypassed paths are decided in one lookup.
+    assert len(authentication.filters) == 3
+    assert authentication.filters[0].unprotected.patterns == (
+        '/login', '/sms_qr_code')
+
+    request = WSGIRequest({**environ, 'PATH_INFO': '/sms_qr_code'})
+    assert authentication(handler)(request).status == 201
+
+    request = WSGIRequest({**environ, 'PATH_INFO': '/index'})
+    response = authentication(handler)(request)
+    assert response.status == 303
+    assert response.headers['Location'] == '/sms_qr_code'
+
+    request = WSGIRequest({**environ, 'PATH_INFO': '/index'})
+    request.context['twoFA'] = True
+    response = authentication(handler)(request)
+    assert response.status == 303
+    assert response.headers['Location'] == '/login'
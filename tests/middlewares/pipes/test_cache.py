@@ -0,0 +1,168 @@
+import time
+import threading
+from unittest.mock import Mock
+from horseman.mapping import RootNode
+from knappe.middlewares.cache import ResponseCache, LRUStore, CachedResponse
+from knappe.pipeline import Pipeline
+from knappe.request import RoutingRequest, WSGIRequest
+from knappe.response import Response
+from knappe.routing import Router
+from webtest import TestApp as WSGIApp
+
+
+class Application(RootNode):
+
+    def __init__(self, middlewares=()):
+        self.router = Router()
+        self.pipeline = Pipeline(middlewares)
+
+    def resolve(self, path_info, environ):
+        request = RoutingRequest(environ, app=self)
+        request.endpoint = self.router.match(path_info, request.method)
+        wrapped = self.pipeline(request.endpoint)
+        return wrapped(request)
+
+
+def entry(body: bytes, ttl: float = 60):
+    return CachedResponse(200, body, (), time.monotonic() + ttl)
+
+
+def test_lru_store():
+    store = LRUStore(max_entries=2, max_size=10)
+    store.set('a', entry(b'aaa'))
+    store.set('b', entry(b'bbb'))
+    assert store.get('a') is not None
+    store.set('c', entry(b'ccc'))
+    assert store.get('b') is None  # least recently used
+    assert len(store) == 2
+
+    store.set('d', entry(b'dddddddd'))
+    assert list(store.entries) == ['d']
+    assert store.size == 8
+
+    store.set('e', entry(b'e' * 11))  # too big to be cached.
+    assert store.get('e') is None
+
+    store.set('f', entry(b'f', ttl=0))
+    assert store.get('f') is None
+    assert store.size == 8
+
+
+def test_response_cache():
+    app = Application(middlewares=[ResponseCache()])
+    tracker = Mock()
+
+    @app.router.register('/', metadata={'cache_ttl': 60})
+    def index(request):
+        tracker()
+        return Response.html(body=f'<p>Hello {tracker.call_count}</p>')
+
+    @app.router.register('/uncached')
+    def uncached(request):
+        tracker()
+        return Response.html(body='<p>Hello</p>')
+
+    @app.router.register('/cookie', metadata={'cache_ttl': 60})
+    def cookie(request):
+        tracker()
+        response = Response.html(body='<p>Hello</p>')
+        response.cookies.set('tracked', 'yes')
+        return response
+
+    test = WSGIApp(app)
+    assert test.get('/').text == '<p>Hello 1</p>'
+    assert test.get('/').text == '<p>Hello 1</p>'
+    assert test.get('/?page=2').text == '<p>Hello 2</p>'
+    assert test.get('/', headers={'Accept-Encoding': 'gzip'}).text == (
+        '<p>Hello 3</p>')
+    assert tracker.call_count == 3
+
+    tracker.reset_mock()
+    test.get('/uncached')
+    test.get('/uncached')
+    assert tracker.call_count == 2
+
+    tracker.reset_mock()
+    test.get('/cookie')
+    response = test.get('/cookie')
+    assert 'tracked=yes' in response.headers['Set-Cookie']
+    assert tracker.call_count == 2
+
+
+def test_response_cache_user(environ):
+    tracker = Mock()
+
+    def handler(request):
+        tracker()
+        return Response.html(body='<p>Hello</p>')
+
+    middleware = ResponseCache(ttl=60)(handler)
+    request = WSGIRequest(app=None, environ=environ)
+    request.context['user'] = object()
+    middleware(request)
+    middleware(request)
+    assert tracker.call_count == 2
+
+    request = WSGIRequest(app=None, environ=environ)
+    request.context['http_session'] = {'user': 'admin'}
+    middleware(request)
+    assert tracker.call_count == 3
+
+    request = WSGIRequest(app=None, environ=environ)
+    request.context['http_session'] = {}
+    middleware(request)
+    middleware(request)
+    assert tracker.call_count == 4
+
+
+def test_response_cache_credentials():
+    # Outermost: the session and authentication are not resolved yet.
+    app = Application(middlewares=[ResponseCache(ttl=60)])
+    tracker = Mock()
+
+    @app.router.register('/')
+    def index(request):
+        tracker()
+        return Response.html(body=f'<p>Hello {tracker.call_count}</p>')
+
+    test = WSGIApp(app)
+    assert test.get('/').text == '<p>Hello 1</p>'
+    assert test.get('/').text == '<p>Hello 1</p>'
+
+    assert test.get('/', headers={'Cookie': 'sid=abc'}).text == (
+        '<p>Hello 2</p>')
+    assert test.get('/', headers={'Cookie': 'auth_token=abc'}).text == (
+        '<p>Hello 3</p>')
+    assert test.get('/', headers={'Authorization': 'Bearer abc'}).text == (
+        '<p>Hello 4</p>')
+    assert test.get('/', headers={'Cookie': 'lang=fr'}).text == (
+        '<p>Hello 1</p>')
+
+
+def test_response_cache_stampede(environ):
+    tracker = Mock()
+    release = threading.Event()
+
+    def handler(request):
+        tracker()
+        release.wait(1)
+        return Response.html(body='<p>Hello</p>')
+
+    middleware = ResponseCache(ttl=60)(handler)
+    responses = []
+
+    def query():
+        request = WSGIRequest(app=None, environ=dict(environ))
+        responses.append(middleware(request))
+
+    threads = [threading.Thread(target=query) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert tracker.call_count == 1
+    assert len(responses) == 5
+    assert {response.body for response in responses} == {'<p>Hello</p>'}
@@ -0,0 +1,89 @@
+import gzip
+import zlib
+import pytest
+from knappe.middlewares.compression import Compression, accepted_encodings
+from knappe.request import WSGIRequest
+from knappe.response import Response
+
+
+HTML = '<html><body>' + 'Knappe ' * 200 + '</body></html>'
+
+
+def test_accepted_encodings():
+    assert accepted_encodings('gzip, deflate;q=0.5, br;q=0') == {
+        'gzip': 1.0, 'deflate': 0.5, 'br': 0.0
+    }
+    assert accepted_encodings('') == {}
+
+
+def test_unknown_encoding():
+    with pytest.raises(ValueError):
+        Compression(encodings=('br',))
+
+
+def test_gzip(environ):
+
+    def handler(request):
+        return Response.html(body=HTML)
+
+    request = WSGIRequest({**environ, 'HTTP_ACCEPT_ENCODING': 'gzip'})
+    response = Compression()(handler)(request)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['Content-Length'] == str(len(response.body))
+    assert gzip.decompress(b''.join(response)) == HTML.encode()
+
+
+def test_deflate_preference(environ):
+
+    def handler(request):
+        return Response.html(body=HTML)
+
+    request = WSGIRequest({
+        **environ, 'HTTP_ACCEPT_ENCODING': 'gzip;q=0, deflate'})
+    response = Compression()(handler)(request)
+    assert response.headers['Content-Encoding'] == 'deflate'
+    assert zlib.decompress(b''.join(response)) == HTML.encode()
+
+
+def test_streaming(environ):
+    chunks = [b'{"row": %d}\n' % i for i in range(500)]
+
+    def handler(request):
+        return Response(200, iter(chunks), headers={
+            'Content-Type': 'application/x-ndjson',
+            'ETag': '"abc"'
+        })
+
+    request = WSGIRequest({**environ, 'HTTP_ACCEPT_ENCODING': '*'})
+    response = Compression(levels={'application/x-ndjson': 1})(
+        handler)(request)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert response.headers['ETag'] == 'W/"abc"'
+    assert gzip.decompress(b''.join(response)) == b''.join(chunks)
+
+
+def test_skipped(environ):
+    request = WSGIRequest({**environ, 'HTTP_ACCEPT_ENCODING': 'gzip'})
+
+    response = Compression()(lambda r: Response.html(body='small'))(request)
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    response = Compression()(lambda r: Response(
+        200, b'x' * 1000, headers={'Content-Type': 'image/png'}))(request)
+    assert 'Content-Encoding' not in response.headers
+    assert 'Vary' not in response.headers
+
+    response = Compression()(lambda r: Response(
+        200, b'x' * 1000, headers={
+            'Content-Type': 'text/plain',
+            'Content-Encoding': 'br'
+        }))(request)
+    assert response.body == b'x' * 1000
+
+    request = WSGIRequest(environ)
+    response = Compression()(lambda r: Response.html(body=HTML))(request)
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
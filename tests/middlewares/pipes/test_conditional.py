@@ -0,0 +1,117 @@
+from unittest.mock import Mock
+from horseman.mapping import RootNode
+from knappe.middlewares.conditional import ConditionalGET, body_etag
+from knappe.pipeline import Pipeline
+from knappe.request import RoutingRequest
+from knappe.response import Response
+from knappe.routing import Router
+from webtest import TestApp as WSGIApp
+
+
+class Application(RootNode):
+
+    def __init__(self, middlewares=()):
+        self.router = Router()
+        self.pipeline = Pipeline(middlewares)
+
+    def resolve(self, path_info, environ):
+        request = RoutingRequest(environ, app=self)
+        request.endpoint = self.router.match(path_info, request.method)
+        wrapped = self.pipeline(request.endpoint)
+        return wrapped(request)
+
+
+def test_body_etag():
+    assert body_etag(b'abc') == body_etag('abc') == body_etag([b'a', b'bc'])
+    assert body_etag(b'abc') != body_etag(b'abd')
+    assert body_etag(iter([b'abc'])) is None
+    assert body_etag(None) is None
+
+
+def test_computed_etag():
+    app = Application(middlewares=[ConditionalGET()])
+    tracker = Mock()
+
+    @app.router.register('/')
+    def index(request):
+        tracker()
+        response = Response.html(body='<p>Hello</p>')
+        response.cookies.set('visited', 'yes')
+        return response
+
+    @app.router.register('/stream')
+    def stream(request):
+        return Response(200, iter([b'streamed']))
+
+    @app.router.register('/post', methods=['POST'])
+    def post(request):
+        return Response.html(body='<p>Hello</p>')
+
+    test = WSGIApp(app)
+    response = test.get('/')
+    etag = response.headers['ETag']
+    assert etag == body_etag(b'<p>Hello</p>')
+
+    response = test.get('/', headers={'If-None-Match': etag}, status=304)
+    assert response.body == b''
+    assert response.headers['ETag'] == etag
+    assert 'visited=yes' in response.headers['Set-Cookie']
+    assert tracker.call_count == 2
+
+    test.get('/', headers={'If-None-Match': '"other"'}, status=200)
+
+    response = test.get('/stream')
+    assert 'ETag' not in response.headers
+
+    response = test.post('/post', headers={'If-None-Match': etag})
+    assert response.status_int == 200
+    assert 'ETag' not in response.headers
+
+
+def test_handler_etag():
+    app = Application(middlewares=[ConditionalGET()])
+
+    @app.router.register('/')
+    def index(request):
+        return Response.html(body='<p>Hello</p>', headers={'ETag': '"v1"'})
+
+    test = WSGIApp(app)
+    test.get('/', headers={'If-None-Match': '"v1"'}, status=304)
+    response = test.get('/', headers={'If-None-Match': '"v0"'}, status=200)
+    assert response.headers['ETag'] == '"v1"'
+
+
+def test_versioned_route():
+    app = Application(middlewares=[ConditionalGET()])
+    tracker = Mock()
+
+    @app.router.register('/', metadata={'etag': lambda request: 'v42'})
+    def index(request):
+        tracker()
+        return Response.html(body='<p>Hello</p>')
+
+    test = WSGIApp(app)
+    response = test.get('/')
+    assert response.headers['ETag'] == '"v42"'
+    assert tracker.call_count == 1
+
+    response = test.get('/', headers={'If-None-Match': '"v42"'}, status=304)
+    assert response.headers['ETag'] == '"v42"'
+    # The handler was short-circuited.
+    assert tracker.call_count == 1
+
+
+def test_versioned_route_headers():
+    app = Application(middlewares=[ConditionalGET()])
+    headers = {'Cache-Control': 'private, max-age=60', 'Vary': 'Cookie'}
+
+    @app.router.register('/', metadata={
+        'etag': lambda request: 'v42', 'etag_headers': headers})
+    def index(request):
+        return Response.html(body='<p>Hello</p>', headers=dict(headers))
+
+    test = WSGIApp(app)
+    response = test.get('/', headers={'If-None-Match': '"v42"'}, status=304)
+    assert response.headers['ETag'] == '"v42"'
+    assert response.headers['Cache-Control'] == 'private, max-age=60'
+    assert response.headers['Vary'] == 'Cookie'
@@ -1,6 +1,12 @@
 import pytest
-from knappe.middlewares.transaction import Transaction
+from unittest.mock import Mock
+from http_session.session import Session
+from knappe.middlewares.transaction import (
+    Transaction, LazyTransactionManager, joined)
+from knappe.request import WSGIRequest
 from knappe.types import Request
+from transaction import TransactionManager
+from transaction.interfaces import TransientError
 
 
 class DummyRequest(Request):
@@ -25,3 +31,185 @@ def test_exception(environ, transaction_manager):
     assert manager.began
     assert manager.aborted
     assert not manager.committed
+
+
+def test_lazy_without_transaction(transaction_manager):
+
+    def handler(request: Request):
+        return 'read only'
+
+    manager = transaction_manager()
+    request = DummyRequest()
+    request.context['transaction_manager'] = manager
+    middleware = Transaction(lazy=True)(handler)
+
+    assert middleware(request) == 'read only'
+    assert not manager.began
+    assert not manager.committed
+    assert not manager.aborted
+    assert request.context['transaction_manager'] is manager
+
+
+def test_lazy_with_transaction(transaction_manager):
+
+    def handler(request: Request):
+        manager = request.context['transaction_manager']
+        assert isinstance(manager, LazyTransactionManager)
+        assert not manager.isDoomed()
+        manager.get()
+        return 'written'
+
+    manager = transaction_manager()
+    request = DummyRequest()
+    request.context['transaction_manager'] = manager
+    middleware = Transaction(lazy=True)(handler)
+
+    assert middleware(request) == 'written'
+    assert manager.began == 1
+    assert manager.committed == 1
+    assert not manager.aborted
+
+
+def test_lazy_exception(transaction_manager):
+
+    def handler(request: Request):
+        request.context['transaction_manager'].get()
+        raise NotImplementedError
+
+    manager = transaction_manager()
+    request = DummyRequest()
+    request.context['transaction_manager'] = manager
+    middleware = Transaction(lazy=True)(handler)
+
+    with pytest.raises(NotImplementedError):
+        middleware(request)
+
+    assert manager.began
+    assert manager.aborted
+    assert not manager.committed
+
+
+def test_joined():
+
+    class DataManager:
+
+        def abort(self, txn):
+            pass
+
+    manager = TransactionManager(explicit=True)
+    txn = manager.begin()
+    assert not joined(txn)
+    txn.join(DataManager())
+    assert joined(txn)
+    txn.abort()
+
+    # Unknown transaction implementation: the vetoes apply.
+    assert joined(object())
+
+
+class ConflictError(TransientError):
+    pass
+
+
+def test_retry(transaction_manager):
+    calls = []
+
+    def handler(request: Request):
+        request.context['attempt'] = len(calls)
+        calls.append(dict(request.context))
+        if len(calls) < 3:
+            raise ConflictError
+        return 'done'
+
+    on_retry = Mock()
+    manager = transaction_manager()
+    request = DummyRequest()
+    request.context['transaction_manager'] = manager
+    middleware = Transaction(
+        attempts=3, backoff=0.001, on_retry=on_retry)(handler)
+
+    assert middleware(request) == 'done'
+    assert manager.began == 3
+    assert manager.aborted == 2
+    assert manager.committed == 1
+    assert on_retry.call_count == 2
+    assert [call.args[1] for call in on_retry.call_args_list] == [1, 2]
+    # Each attempt starts with a fresh context.
+    assert [set(context) for context in calls] == [
+        {'transaction_manager', 'attempt'}] * 3
+
+
+def test_retry_exhausted(transaction_manager):
+
+    def handler(request: Request):
+        raise ConflictError
+
+    manager = transaction_manager()
+    request = DummyRequest()
+    request.context['transaction_manager'] = manager
+    middleware = Transaction(attempts=2, backoff=0.001)(handler)
+
+    with pytest.raises(ConflictError):
+        middleware(request)
+    assert manager.began == 2
+    assert manager.aborted == 2
+    assert not manager.committed
+
+
+def test_no_retry_on_non_retryable(transaction_manager):
+
+    def handler(request: Request):
+        raise ValueError
+
+    manager = transaction_manager()
+    request = DummyRequest()
+    request.context['transaction_manager'] = manager
+    middleware = Transaction(attempts=3, backoff=0.001)(handler)
+
+    with pytest.raises(ValueError):
+        middleware(request)
+    assert manager.began == 1
+    assert manager.aborted == 1
+
+
+def test_no_retry_on_streamed_body(transaction_manager, environ):
+    calls = []
+
+    def handler(request: Request):
+        calls.append(request)
+        request.parts()
+        raise ConflictError
+
+    request = WSGIRequest({
+        **environ,
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': 'multipart/form-data; boundary=x'
+    })
+    request.context['transaction_manager'] = transaction_manager()
+    middleware = Transaction(attempts=3, backoff=0.001)(handler)
+    with pytest.raises(ConflictError):
+        middleware(request)
+    assert len(calls) == 1
+
+
+def test_no_retry_on_modified_session(transaction_manager):
+    calls = []
+
+    def handler(request: Request):
+        calls.append(request)
+        request.context['http_session']['user'] = 'admin'
+        raise ConflictError
+
+    request = DummyRequest()
+    request.context['transaction_manager'] = transaction_manager()
+    request.context['http_session'] = Session('sid', store=None, new=True)
+    middleware = Transaction(attempts=3, backoff=0.001)(handler)
+    with pytest.raises(ConflictError):
+        middleware(request)
+    assert len(calls) == 1
+
+
+def test_backoff():
+    middleware = Transaction(backoff=0.1, max_backoff=0.3)
+    for attempt, ceiling in ((1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)):
+        assert 0 <= middleware.delay(attempt) <= ceiling
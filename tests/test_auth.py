@@ -1,6 +1,23 @@
+import time
+from unittest.mock import Mock, patch
+from concurrent.futures import ThreadPoolExecutor
 from knappe.request import WSGIRequest
-from knappe.auth import WSGISessionAuthenticator
-from knappe.fixtures.auth import DictSource
+from knappe.response import Response
+from knappe.auth import (
+    WSGISessionAuthenticator, SignedTokenAuthenticator, TokenUser)
+from knappe.fixtures.auth import DictSource, UserObject
+
+
+class SlowSource(DictSource):
+
+    def __init__(self, users, delay, timeout=None):
+        super().__init__(users)
+        self.delay = delay
+        self.timeout = timeout
+
+    def find(self, credentials, request):
+        time.sleep(self.delay)
+        return super().find(credentials, request)
 
 
 def test_source(environ):
@@ -41,3 +58,191 @@ def test_several_sources(environ):
         'password': 'test'
     })
     assert user.id == 'test'
+
+
+def test_concurrent_sources(environ):
+    request = WSGIRequest(environ)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        authenticator = WSGISessionAuthenticator([
+            SlowSource({'admin': 'admin'}, delay=0.1),
+            SlowSource({'admin': 'other'}, delay=0),
+            DictSource({'test': 'test'}),
+        ], executor=executor)
+
+        # The first source has the priority, even when slower.
+        user = authenticator.from_credentials(request, {
+            'username': 'admin',
+            'password': 'admin'
+        })
+        assert user.id == 'admin'
+
+        user = authenticator.from_credentials(request, {
+            'username': 'test',
+            'password': 'test'
+        })
+        assert user.id == 'test'
+
+        user = authenticator.from_credentials(request, {
+            'username': 'john',
+            'password': 'test'
+        })
+        assert user is None
+
+
+def test_concurrent_sources_timeout(environ):
+    request = WSGIRequest(environ)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        authenticator = WSGISessionAuthenticator([
+            SlowSource({'admin': 'admin'}, delay=0.5, timeout=0.05),
+            DictSource({'admin': 'admin'}),
+        ], executor=executor)
+
+        start = time.monotonic()
+        user = authenticator.from_credentials(request, {
+            'username': 'admin',
+            'password': 'admin'
+        })
+        assert user.id == 'admin'
+        assert time.monotonic() - start < 0.5
+
+
+def test_fetch_many(environ):
+    request = WSGIRequest(environ)
+    first = DictSource({'admin': 'admin', 'test': 'test'})
+    second = DictSource({'john': 'doe', 'test': 'other'})
+    second.fetch_many = Mock(wraps=second.fetch_many)
+    authenticator = WSGISessionAuthenticator([first, second])
+
+    users = authenticator.fetch_many(request, ['admin', 'john', 'jane'])
+    assert {uid: user.id for uid, user in users.items()} == {
+        'admin': 'admin',
+        'john': 'john'
+    }
+    # Only the ids unresolved by the first source are passed along.
+    second.fetch_many.assert_called_once_with({'john', 'jane'}, request)
+
+
+def test_user_loader(environ):
+    request = WSGIRequest(environ)
+    source = DictSource({'admin': 'admin', 'test': 'test'})
+    source.fetch_many = Mock(wraps=source.fetch_many)
+    authenticator = WSGISessionAuthenticator([source])
+
+    loader = authenticator.loader(request)
+    assert authenticator.loader(request) is loader
+    assert request.context['user_loader'] is loader
+
+    loader.queue('admin', 'test', 'john')
+    assert loader['admin'].id == 'admin'
+    assert loader['test'].id == 'test'
+    assert loader['john'] is None
+    source.fetch_many.assert_called_once()
+
+    users = loader.get_many(['admin', 'jane'])
+    assert users['admin'].id == 'admin'
+    assert users['jane'] is None
+    assert source.fetch_many.call_count == 2
+    source.fetch_many.assert_called_with({'jane'}, request)
+
+
+def test_signed_token(environ):
+    source = DictSource({'admin': 'admin'})
+    source.fetch = Mock(wraps=source.fetch)
+    authenticator = SignedTokenAuthenticator(
+        [source], secret='my secret', claims=lambda user: {'role': 'admin'})
+
+    request = WSGIRequest(environ)
+    assert authenticator.identify(request) is None
+
+    user = authenticator.from_credentials(request, {
+        'username': 'admin',
+        'password': 'admin'
+    })
+    authenticator.remember(request, user)
+    response = authenticator.finalize(request, Response(200))
+    cookie = response.cookies['auth_token']
+    assert cookie.startswith('auth_token=')
+    assert 'HttpOnly' in cookie
+
+    token = request.context['auth_token']
+    request = WSGIRequest({**environ, 'HTTP_COOKIE': f'auth_token={token}'})
+    user = authenticator.identify(request)
+    assert isinstance(user, TokenUser)
+    assert user.id == 'admin'
+    assert user.claims == {'role': 'admin'}
+    assert request.context['user'] is user
+    source.fetch.assert_not_called()
+
+    request = WSGIRequest({
+        **environ, 'HTTP_AUTHORIZATION': f'Bearer {token}'})
+    assert authenticator.identify(request).id == 'admin'
+
+    request = WSGIRequest({
+        **environ, 'HTTP_AUTHORIZATION': f'Bearer {token}tampered'})
+    assert authenticator.identify(request) is None
+
+    authenticator.forget(request)
+    response = authenticator.finalize(request, Response(200))
+    assert 'Expires=Thu, 01 Jan 1970' in response.cookies['auth_token']
+
+
+def test_signed_token_expiration(environ):
+    source = DictSource({'admin': 'admin'})
+    authenticator = SignedTokenAuthenticator(
+        [source], secret='my secret', TTL=60)
+    token = authenticator.issue(UserObject('admin'))
+    request = WSGIRequest({**environ, 'HTTP_COOKIE': f'auth_token={token}'})
+    with patch('time.time', return_value=time.time() + 120):
+        assert authenticator.identify(request) is None
+
+
+def test_signed_token_revalidation(environ):
+    source = DictSource({'admin': 'admin'})
+    source.fetch = Mock(wraps=source.fetch)
+    authenticator = SignedTokenAuthenticator(
+        [source], secret='my secret', revalidate=30)
+
+    token = authenticator.issue(UserObject('admin'))
+    request = WSGIRequest({**environ, 'HTTP_COOKIE': f'auth_token={token}'})
+    with patch('time.time', return_value=time.time() + 60):
+        user = authenticator.identify(request)
+    assert isinstance(user, UserObject)
+    source.fetch.assert_called_once_with('admin', request)
+    # A fresh token was issued.
+    assert request.context['auth_token'] != token
+
+    token = authenticator.issue(UserObject('john'))
+    request = WSGIRequest({**environ, 'HTTP_COOKIE': f'auth_token={token}'})
+    with patch('time.time', return_value=time.time() + 60):
+        assert authenticator.identify(request) is None
+    assert request.context['auth_token'] == ''
+
+
+def test_signed_token_bearer_revalidation(environ):
+    source = DictSource({'admin': 'admin'})
+    source.fetch = Mock(wraps=source.fetch)
+    authenticator = SignedTokenAuthenticator(
+        [source], secret='my secret', revalidate=30)
+
+    token = authenticator.issue(UserObject('admin'))
+    later = time.time() + 60
+    request = WSGIRequest({
+        **environ, 'HTTP_AUTHORIZATION': f'Bearer {token}'})
+    with patch('time.time', return_value=later):
+        assert authenticator.identify(request).id == 'admin'
+    response = authenticator.finalize(request, Response(200))
+    assert source.fetch.call_count == 1
+
+    # The renewed token is returned in a header, not as a cookie.
+    renewed = response.headers['X-Auth-Token']
+    assert renewed == request.context['auth_token'] != token
+    assert not response.cookies
+    assert 'Set-Cookie' not in response.headers
+
+    request = WSGIRequest({
+        **environ, 'HTTP_AUTHORIZATION': f'Bearer {renewed}'})
+    with patch('time.time', return_value=later + 1):
+        assert authenticator.identify(request).id == 'admin'
+    response = authenticator.finalize(request, Response(200))
+    assert source.fetch.call_count == 1
+    assert 'X-Auth-Token' not in response.headers
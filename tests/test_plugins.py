@@ -126,3 +126,39 @@ def test_plugin_on_func():
             method='GET'
         )
     }
+
+
+def test_plugin_merges_shared_components():
+    router1 = routing.Router()
+    router2 = routing.Router()
+    plugin1 = Plugin('route1', components={"router": router1})
+    plugin2 = Plugin('route2', components={"router": router2})
+
+    @router1.register('/')
+    def index(request):
+        return Response(200, body='ok')
+
+    @router2.register('/other')
+    def other(request):
+        return Response(200, body='ok')
+
+    shared = routing.Router()
+    app1 = RoutingApplication()
+    app2 = RoutingApplication()
+    app1.router = app2.router = shared
+
+    # The shared component is copied, not altered.
+    plugin1.install(app1)
+    assert app1.router is not shared
+    assert app1.router.match('/', 'GET') is not None
+    assert app2.router is shared
+    assert dict(shared) == {}
+
+    # The copy belongs to the app: merged in place from then on.
+    merged = app1.router
+    plugin2.install(app1)
+    assert app1.router is merged
+    assert set(app1.router) == {('/', 'GET'), ('/other', 'GET')}
+    assert app1.router.match('/other', 'GET') is not None
+    assert dict(shared) == {}
+    assert dict(router1) == {('/', 'GET'): router1[('/', 'GET')]}
@@ -1,5 +1,12 @@
+import pytest
+from horseman.exceptions import HTTPError
+from horseman.mapping import RootNode
+from webtest import TestApp as WSGIApp
 from webtest.app import TestRequest as Request
-from knappe.request import RoutingRequest
+from knappe.forms import BodyLimits
+from knappe.request import RoutingRequest, RequestPool
+from knappe.response import Response, FileResponse
+from knappe.routing import Router
 from knappe.meta import Route, MatchedRoute
 
 
@@ -24,3 +31,231 @@ def test_routing_request():
     assert request.params is None
     request.endpoint = matched
     assert request.params == {'test': 1}
+
+
+def multipart_environ(**fields):
+    return Request.blank(
+        '/upload', method='POST', POST=fields,
+        content_type='multipart/form-data').environ
+
+
+def test_urlencoded_form():
+    environ = Request.blank(
+        '/', method='POST', POST={'name': 'Knappe', 'tag': 'été'}).environ
+    request = RoutingRequest(environ)
+    assert request.form.get('name') == 'Knappe'
+    assert request.form.form == {'name': ['Knappe'], 'tag': ['été']}
+    assert request.form.files == {}
+    assert request.form is request.form  # parsed once.
+
+
+def test_multipart_form():
+    content = b'0123456789' * 1000
+    request = RoutingRequest(multipart_environ(
+        title='Report', document=('report.txt', content)))
+    request.body_limits = BodyLimits(memory_threshold=100, chunk_size=128)
+    form = request.form
+    assert form.get('title') == 'Report'
+    [upload] = form.files['document']
+    assert upload.filename == 'report.txt'
+    assert upload.size == len(content)
+    assert upload.file._rolled  # spooled on the disk.
+    assert upload.file.read() == content
+    form.close()
+
+    with pytest.raises(RuntimeError):
+        request.parts()
+
+
+def test_multipart_parts():
+    content = b'\r\n--' + b'x' * 5000
+    request = RoutingRequest(multipart_environ(
+        first='1', upload=('data.bin', content), last='2'))
+    request.body_limits = BodyLimits(chunk_size=7)
+    parts = request.parts()
+    first = next(parts)
+    assert (first.name, first.filename) == ('first', None)
+    upload = next(parts)
+    assert upload.filename == 'data.bin'
+    assert b''.join(upload) == content
+    last = next(parts)
+    assert last.read() == b'2'
+    assert list(parts) == []
+
+    with pytest.raises(RuntimeError):
+        request.form
+
+    # Skipped contents are drained.
+    request = RoutingRequest(multipart_environ(
+        first='1', upload=('data.bin', content), last='2'))
+    assert [part.name for part in request.parts()] == [
+        'first', 'upload', 'last']
+
+
+def test_body_limits():
+    request = RoutingRequest(multipart_environ(
+        upload=('data.bin', b'x' * 1000)))
+    request.body_limits = BodyLimits(max_body_size=500)
+    with pytest.raises(HTTPError) as exc:
+        request.form
+    assert exc.value.status == 413
+
+    request = RoutingRequest(multipart_environ(
+        upload=('data.bin', b'x' * 1000)))
+    request.body_limits = BodyLimits(max_file_size=500)
+    with pytest.raises(HTTPError) as exc:
+        request.form
+    assert exc.value.status == 413
+
+    request = RoutingRequest(multipart_environ(a='1', b='2', c='3'))
+    request.body_limits = BodyLimits(max_parts=2)
+    with pytest.raises(HTTPError) as exc:
+        request.form
+    assert exc.value.status == 413
+
+
+def test_context_factory():
+
+    class Context(dict):
+        pass
+
+    class ContextRequest(RoutingRequest):
+        context_factory = Context
+
+    request = ContextRequest(Request.blank('/').environ)
+    assert isinstance(request.context, Context)
+    assert type(RoutingRequest(Request.blank('/').environ).context) is dict
+
+
+def test_cached_properties():
+    environ = Request.blank(
+        '/app/path?key=1&key=2',
+        headers={
+            'Cookie': 'sid=abc; lang=fr',
+            'Accept': 'text/html;q=0.9, application/json, */*;q=0.1',
+            'Host': 'example.com:8080',
+        }
+    ).environ
+    request = RoutingRequest(environ)
+    assert request.path == '/app/path'
+    assert request.query.get('key') == '1'
+    assert request.query.getlist('key') == ('1', '2')
+    assert request.cookies['sid'] == 'abc'
+    assert request.cookies is request.cookies
+    assert request.query is request.query
+    assert request.host == 'example.com:8080'
+    assert request.domain == 'example.com'
+    assert request.domain is request.domain
+    assert request.accept == (
+        ('application/json', 1.0), ('text/html', 0.9), ('*/*', 0.1))
+
+    environ = Request.blank('/').environ
+    del environ['HTTP_HOST']
+    environ.update({
+        'SERVER_NAME': '::1', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http'
+    })
+    request = RoutingRequest(environ)
+    assert request.host == '::1'
+    assert request.accept == ()
+
+    environ['HTTP_HOST'] = '[::1]:8080'
+    assert RoutingRequest(environ).domain == '[::1]'
+
+
+def test_request_pool(tmp_path):
+    pool = RequestPool(RoutingRequest, size=2)
+    request = pool.acquire(
+        Request.blank('/first?a=1').environ, context={'ui': 'UI'})
+    assert request.path == '/first'
+    assert request.query.get('a') == '1'
+    request.context['user'] = 'admin'
+    response = pool.bind(request, Response(200, b'first'))
+    del request
+    response.close()
+    assert len(pool.free) == 1
+    recycled = pool.free[0]
+
+    request = pool.acquire(Request.blank('/second').environ)
+    assert request is recycled
+    assert pool.free == []
+    assert request.path == '/second'
+    assert request.query.get('a') is None
+    assert request.context == {}
+    assert request.endpoint is None
+
+    # The request escapes: it is not recycled.
+    tasks = [request]
+    response = pool.bind(request, Response(200, b'second'))
+    del request
+    response.close()
+    assert pool.free == []
+
+    # The context escapes.
+    request = pool.acquire(Request.blank('/third').environ)
+    tasks.append(request.context)
+    response = pool.bind(request, Response(200, b'third'))
+    del request
+    response.close()
+    assert pool.free == []
+
+    # File responses are not bound.
+    path = tmp_path / 'file.txt'
+    path.write_bytes(b'content')
+    request = pool.acquire(Request.blank('/file').environ)
+    response = pool.bind(request, FileResponse(path))
+    assert not response._finishers
+
+
+def test_request_pool_calibration():
+    pool = RequestPool(RoutingRequest)
+    assert pool.expected is not None
+    assert pool.probe(True)[0] == pool.probe(False)[0] + 1
+
+
+def test_request_pool_serve():
+    escaped = []
+    served = []
+
+    class Application(RootNode):
+
+        def __init__(self):
+            self.router = Router()
+            self.requests = RequestPool(RoutingRequest, size=2)
+
+        def handle(self, request):
+            request.endpoint = self.router.match(request.path, request.method)
+            return request.endpoint(request)
+
+        def resolve(self, path_info, environ):
+            return self.requests.serve(
+                self.handle, environ, app=self, context={'ui': 'UI'})
+
+    app = Application()
+
+    @app.router.register('/')
+    def index(request):
+        served.append(id(request))
+        request.context['user'] = 'admin'
+        return Response.html(body=f"<p>{request.query.get('a')}</p>")
+
+    @app.router.register('/escape')
+    def escape(request):
+        escaped.append(request)
+        return Response.html(body='<p>escaped</p>')
+
+    test = WSGIApp(app)
+    assert test.get('/?a=1').text == '<p>1</p>'
+    assert len(app.requests.free) == 1
+    assert test.get('/').text == '<p>None</p>'
+    assert served[0] == served[1]  # The request was recycled.
+
+    # An escaped request is never handed out again.
+    test.get('/escape')
+    test.get('/escape')
+    assert len(escaped) == 2
+    assert escaped[0] is not escaped[1]
+    assert app.requests.free == []
+    test.get('/')
+    test.get('/')
+    assert all(request.path == '/escape' for request in escaped)
+    assert escaped[1].context == {'ui': 'UI'}
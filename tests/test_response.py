@@ -2,8 +2,8 @@ import pytest
 import webtest
 from unittest.mock import Mock
 from http import HTTPStatus
-from knappe.utils import file_iterator
-from knappe.response import Response
+from knappe.utils import file_iterator, http_date, parse_ranges
+from knappe.response import Response, FileResponse
 
 
 def test_file_iterator(tmpdir):
@@ -46,6 +46,156 @@ def test_file_iterator(tmpdir):
     ]
 
 
+def test_file_path(tmpdir):
+    fpath = tmpdir / 'test.txt'
+    with fpath.open('w+') as fd:
+        fd.write('This is a sentence')
+
+    stat = fpath.stat()
+    response = Response.from_file_path(fpath)
+    assert isinstance(response, FileResponse)
+    assert response.status == 200
+    assert list(response.headers.items()) == [
+        ('Content-Disposition', 'attachment;filename=test.txt'),
+        ('Content-Type', 'text/plain'),
+        ('Content-Length', '18'),
+        ('Accept-Ranges', 'bytes'),
+        ('ETag', f'"{stat.mtime_ns:x}-12"'),
+        ('Last-Modified', http_date(stat.mtime)),
+    ]
+    assert list(response) == [b'This is a sentence']
+
+    response = Response.from_file_path(
+        fpath, filename='other.txt',
+        headers={'Content-Type': 'foo'}, chunk_size=10)
+    assert response.headers['Content-Type'] == 'foo'
+    assert response.headers['Content-Disposition'] == (
+        'attachment;filename=other.txt')
+    assert list(response) == [b'This is a ', b'sentence']
+
+    app = webtest.TestApp(Response.from_file_path(fpath))
+    assert app.get('/').body == b'This is a sentence'
+
+
+def test_file_wrapper(tmpdir):
+    fpath = tmpdir / 'test.bin'
+    with fpath.open('wb') as fd:
+        fd.write(b'abc')
+
+    wrapper = Mock()
+    start_response = Mock()
+    response = Response.from_file_path(fpath, chunk_size=1024)
+    assert response.headers['Content-Type'] == 'application/octet-stream'
+
+    result = response({'wsgi.file_wrapper': wrapper}, start_response)
+    assert result is wrapper.return_value
+    start_response.assert_called_once()
+    filelike, block_size = wrapper.call_args.args
+    assert block_size == 1024
+    assert filelike.read() == b'abc'
+    filelike.close()
+
+    # Finishers must run: the file wrapper is bypassed.
+    wrapper.reset_mock()
+    response.add_finisher(Mock())
+    result = response({'wsgi.file_wrapper': wrapper}, Mock())
+    assert result is response
+    wrapper.assert_not_called()
+
+
+def test_parse_ranges():
+    assert parse_ranges('bytes=0-4', 10) == [(0, 4)]
+    assert parse_ranges('bytes=5-', 10) == [(5, 9)]
+    assert parse_ranges('bytes=-3', 10) == [(7, 9)]
+    assert parse_ranges('bytes=-30', 10) == [(0, 9)]
+    assert parse_ranges('bytes=0-100', 10) == [(0, 9)]
+    assert parse_ranges('bytes=0-1, 4-5', 10) == [(0, 1), (4, 5)]
+    assert parse_ranges('bytes=10-20', 10) == []
+    assert parse_ranges('bytes=-0', 10) == []
+    assert parse_ranges('bytes=5-2', 10) is None
+    assert parse_ranges('bytes=a-2', 10) is None
+    assert parse_ranges('items=0-2', 10) is None
+
+
+def test_file_conditional(tmpdir):
+    fpath = tmpdir / 'test.txt'
+    with fpath.open('w+') as fd:
+        fd.write('This is a sentence')
+
+    app = webtest.TestApp(Response.from_file_path(fpath))
+    response = app.get('/')
+    etag = response.headers['ETag']
+    modified = response.headers['Last-Modified']
+
+    response = webtest.TestApp(Response.from_file_path(fpath)).get(
+        '/', headers={'If-None-Match': etag}, status=304)
+    assert response.body == b''
+    assert response.headers['ETag'] == etag
+
+    response = webtest.TestApp(Response.from_file_path(fpath)).get(
+        '/', headers={'If-None-Match': '"other", W/' + etag}, status=304)
+
+    response = webtest.TestApp(Response.from_file_path(fpath)).get(
+        '/', headers={'If-None-Match': '"other"'}, status=200)
+    assert response.body == b'This is a sentence'
+
+    response = webtest.TestApp(Response.from_file_path(fpath)).get(
+        '/', headers={'If-Modified-Since': modified}, status=304)
+
+    response = webtest.TestApp(Response.from_file_path(fpath)).get(
+        '/', headers={'If-Modified-Since': http_date(0)}, status=200)
+
+
+def test_file_ranges(tmpdir):
+    fpath = tmpdir / 'test.txt'
+    with fpath.open('w+') as fd:
+        fd.write('This is a sentence')
+
+    def get(**headers):
+        app = webtest.TestApp(Response.from_file_path(fpath, chunk_size=4))
+        return app.get('/', headers=headers, expect_errors=True)
+
+    response = get(Range='bytes=5-8')
+    assert response.status_int == 206
+    assert response.body == b'is a'
+    assert response.headers['Content-Range'] == 'bytes 5-8/18'
+    assert response.headers['Content-Length'] == '4'
+
+    response = get(Range='bytes=-8')
+    assert response.status_int == 206
+    assert response.body == b'sentence'
+
+    response = get(Range='bytes=40-')
+    assert response.status_int == 416
+    assert response.headers['Content-Range'] == 'bytes */18'
+
+    response = get(Range='bytes=0-3,10-17')
+    assert response.status_int == 206
+    content_type = response.headers['Content-Type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    boundary = content_type.split('=', 1)[1]
+    assert response.body == (
+        f'--{boundary}\r\n'
+        'Content-Type: text/plain\r\n'
+        'Content-Range: bytes 0-3/18\r\n\r\n'
+        'This\r\n'
+        f'--{boundary}\r\n'
+        'Content-Type: text/plain\r\n'
+        'Content-Range: bytes 10-17/18\r\n\r\n'
+        'sentence\r\n'
+        f'--{boundary}--\r\n'
+    ).encode()
+    assert response.headers['Content-Length'] == str(len(response.body))
+
+    etag = get().headers['ETag']
+    response = get(Range='bytes=5-8', **{'If-Range': etag})
+    assert response.status_int == 206
+
+    response = get(Range='bytes=5-8', **{'If-Range': '"outdated"'})
+    assert response.status_int == 200
+    assert response.body == b'This is a sentence'
+
+
 def test_json_response_headers():
     response = Response.from_json(body="{}")
     assert list(response.headers.items()) == [
@@ -184,3 +334,80 @@ def test_invalid_redirect():
     with pytest.raises(ValueError) as exc:
         Response.redirect('/test', code=400)
     assert str(exc.value) == '400: unknown redirection code.'
+
+
+def test_json_stream_response():
+    from knappe.utils import json_array_chunks, ndjson_chunks
+
+    assert list(json_array_chunks(iter([]))) == [b'[', b']']
+    chunks = json_array_chunks(({'id': i} for i in range(5)), batch=2)
+    assert list(chunks) == [
+        b'[', b'{"id":0},{"id":1}', b',{"id":2},{"id":3}', b',{"id":4}]'
+    ]
+    assert list(ndjson_chunks(iter([]))) == []
+    assert list(ndjson_chunks(range(3), batch=2)) == [b'0\n1\n', b'2\n']
+
+    app = webtest.TestApp(
+        Response.to_json_stream(body=({'id': i} for i in range(1000))))
+    response = app.get('/')
+    assert response.headers['Content-Type'] == 'application/json'
+    assert response.json == [{'id': i} for i in range(1000)]
+
+    app = webtest.TestApp(
+        Response.to_ndjson(body=({'id': i} for i in range(3))))
+    response = app.get('/')
+    assert response.headers['Content-Type'] == 'application/x-ndjson'
+    assert response.body == b'{"id":0}\n{"id":1}\n{"id":2}\n'
+
+
+def test_json_options():
+    import orjson
+    from decimal import Decimal
+    from knappe.response import JSONFragment
+
+    response = Response.to_json(
+        body={'b': 1, 'a': Decimal('1.5'), 1: 'int key'},
+        default=str,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    )
+    assert response.body == b'{"1":"int key","a":"1.5","b":1}'
+
+    cached = JSONFragment(b'{"rows":[1,2,3]}')
+    response = Response.to_json(body={'data': cached, 'page': 1})
+    assert response.body == b'{"data":{"rows":[1,2,3]},"page":1}'
+
+    response = Response.to_ndjson(
+        body=[{'b': 1, 'a': 2}], option=orjson.OPT_SORT_KEYS)
+    assert list(response) == [b'{"a":2,"b":1}\n']
+
+
+def test_content_length():
+    response = Response(200, [b'<p>', 'Hello', b'</p>'])
+    response.prepare()
+    assert response.body == b'<p>Hello</p>'
+    assert response.headers['Content-Length'] == '12'
+
+    response = Response(200, 'Héllo')
+    response.prepare()
+    assert response.body == 'Héllo'.encode()
+    assert response.headers['Content-Length'] == '6'
+
+    response = Response(200, [b'a' * 40, b'b' * 40])
+    response.coalesce_threshold = 64
+    response.prepare()
+    assert response.body == [b'a' * 40, b'b' * 40]
+    assert response.headers['Content-Length'] == '80'
+
+    chunks = iter([b'streamed'])
+    response = Response(200, chunks)
+    response.prepare()
+    assert response.body is chunks
+    assert 'Content-Length' not in response.headers
+
+    response = Response(204)
+    response.prepare()
+    assert 'Content-Length' not in response.headers
+
+    app = webtest.TestApp(Response(404))
+    response = app.get('/', status=404)
+    assert response.headers['Content-Length'] == str(len(response.body))
@@ -0,0 +1,134 @@
+import gzip
+import pytest
+import webtest
+from pathlib import Path
+from horseman.mapping import RootNode
+from knappe.request import RoutingRequest
+from knappe.response import Response, FileResponse
+from knappe.routing import Router
+from knappe.static import StaticFiles, IMMUTABLE
+
+
+class Application(RootNode):
+
+    def __init__(self):
+        self.router = Router()
+
+    def resolve(self, path_info, environ):
+        request = RoutingRequest(environ, app=self)
+        if endpoint := self.router.match(path_info, request.method):
+            request.endpoint = endpoint
+            return endpoint(request)
+        return Response(404)
+
+
+@pytest.fixture
+def static_root(tmpdir):
+    root = Path(tmpdir)
+    (root / 'css').mkdir()
+    (root / 'css' / 'app.css').write_text('body {color: red}')
+    (root / 'css' / 'app.css.gz').write_bytes(
+        gzip.compress(b'body {color: red}'))
+    (root / 'big.js').write_text('x' * 1000)
+    return root
+
+
+def test_index(static_root):
+    (static_root / 'archive.tar.gz').write_bytes(gzip.compress(b'tar'))
+    static = StaticFiles(static_root, memory_threshold=100)
+    assert set(static.assets) == {'css/app.css', 'big.js', 'archive.tar.gz'}
+    assert set(static.urls) == set(static.assets)
+    assert static.assets['archive.tar.gz'].gzipped is None
+
+    asset = static.assets['css/app.css']
+    assert asset.content_type == 'text/css'
+    assert asset.size == 17
+    assert asset.data == b'body {color: red}'
+    assert asset.gzipped.path == static_root / 'css' / 'app.css.gz'
+    assert static.assets['big.js'].data is None
+
+    url = static.url('css/app.css')
+    assert url.startswith('/static/css/app.')
+    assert url.endswith('.css')
+
+
+def test_serving(static_root):
+    app = Application()
+    static = StaticFiles(static_root, memory_threshold=100).mount(app.router)
+    test = webtest.TestApp(app)
+
+    response = test.get('/static/css/app.css')
+    assert response.body == b'body {color: red}'
+    assert response.headers['Content-Type'] == 'text/css'
+    assert response.headers['Cache-Control'] == 'public, max-age=3600'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert 'Content-Encoding' not in response.headers
+    etag = response.headers['ETag']
+
+    test.get('/static/css/app.css',
+             headers={'If-None-Match': etag}, status=304)
+
+    # The test application decodes the gzipped body transparently.
+    response = test.get('/static/css/app.css',
+                        headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.body == b'body {color: red}'
+    assert response.headers['ETag'] == static.assets[
+        'css/app.css'].gzipped.etag
+
+    response = test.get('/static/css/app.css', status=304, headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+    })
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    # The precompressed variant is not served on its own.
+    test.get('/static/css/app.css.gz', status=404)
+
+    response = test.get(static.url('css/app.css'))
+    assert response.headers['Cache-Control'] == IMMUTABLE
+
+    response = test.get('/static/big.js')
+    assert response.body == b'x' * 1000
+    assert response.headers['Content-Type'] == 'text/javascript'
+
+    test.get('/static/unknown.js', status=404)
+    test.get('/static/../setup.py', status=404)
+
+
+def test_large_files_are_streamed(static_root, environ):
+    static = StaticFiles(static_root, memory_threshold=100)
+    app = Application()
+    static.mount(app.router)
+    request = RoutingRequest(environ)
+    request.endpoint = app.router.match('/static/big.js', 'GET')
+    response = static(request)
+    assert isinstance(response, FileResponse)
+    assert response.stat is static.assets['big.js'].stat
+
+
+def test_gzipped_variant(static_root, environ):
+    static = StaticFiles(static_root)
+    app = Application()
+    static.mount(app.router)
+    request = RoutingRequest({**environ, 'HTTP_ACCEPT_ENCODING': 'gzip'})
+    request.endpoint = app.router.match('/static/css/app.css', 'GET')
+    response = static(request)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Type'] == 'text/css'
+    assert gzip.decompress(response.body) == b'body {color: red}'
+
+
+@pytest.mark.parametrize('accept_encoding', [
+    'gzip;q=0', 'x-gzip-nope', 'deflate, *;q=0', 'identity'
+])
+def test_gzipped_variant_refused(static_root, environ, accept_encoding):
+    static = StaticFiles(static_root)
+    app = Application()
+    static.mount(app.router)
+    request = RoutingRequest(
+        {**environ, 'HTTP_ACCEPT_ENCODING': accept_encoding})
+    request.endpoint = app.router.match('/static/css/app.css', 'GET')
+    response = static(request)
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.body == b'body {color: red}'
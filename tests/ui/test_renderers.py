@@ -0,0 +1,74 @@
+from unittest.mock import patch
+from webtest.app import TestRequest as Request
+from knappe.renderers import html, template
+from knappe.request import RoutingRequest
+from knappe.ui import UI
+from knappe.ui.templates import Templates
+
+
+def make_ui(tmp_path):
+    (tmp_path / 'views').mkdir()
+    (tmp_path / 'views' / 'page.pt').write_text(
+        '<p>${message} ${request.path}</p>')
+    ui = UI()
+    ui.templates = Templates().register_path(tmp_path / 'views')
+
+    @ui.layouts.register([RoutingRequest], name='')
+    def layout(request, body, namespace):
+        return f'<main>{body}</main>'
+
+    return ui
+
+
+def test_html_resolution_cache(tmp_path):
+    ui = make_ui(tmp_path)
+
+    @html('page')
+    def view(request):
+        return {'message': 'Hello'}
+
+    request = RoutingRequest(
+        Request.blank('/some/path').environ, context={'ui': ui})
+    with patch.object(
+            ui.layouts, 'find_one', wraps=ui.layouts.find_one) as find_one:
+        response = view(request)
+        assert response.body == '<main><p>Hello /some/path</p></main>'
+        view(request)
+        assert find_one.call_count == 1
+
+        assert view.bare(request) == '<p>Hello /some/path</p>'
+
+        # Changing the templates invalidates the resolution.
+        (tmp_path / 'other').mkdir()
+        (tmp_path / 'other' / 'extra.pt').write_text('<p>Extra</p>')
+        ui.templates.register_path(tmp_path / 'other')
+        view(request)
+        assert find_one.call_count == 2
+
+        # So does changing the layouts.
+        @ui.layouts.register([RoutingRequest], name='')
+        def other_layout(request, body, namespace):
+            return f'<div>{body}</div>'
+
+        response = view(request)
+        assert response.body == '<div><p>Hello /some/path</p></div>'
+        assert find_one.call_count == 3
+
+
+def test_template_resolution_cache(tmp_path):
+    ui = make_ui(tmp_path)
+
+    @template('page')
+    def view(request):
+        return {'message': 'Hi'}
+
+    request = RoutingRequest(
+        Request.blank('/path').environ, context={'ui': ui})
+    with patch.object(
+            ui.templates, 'get', wraps=ui.templates.get) as get:
+        assert view(request) == '<p>Hi /path</p>'
+        assert view(request) == '<p>Hi /path</p>'
+        assert get.call_count == 1
+
+        ui.templates = ui.templates | Templates()
+        assert view(request) == '<p>Hi /path</p>'
@@ -1,3 +1,11 @@
+import os
+import time
+import shutil
+import threading
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from knappe.ui.loader import TemplateCache, PageTemplateFile
 from knappe.ui.templates import Templates, TemplatesChain
 
 
@@ -26,6 +34,7 @@ def test_prefix():
     templates2 = Templates().register_package_resources('knappe.fixtures:templates')
     assert set(templates2.registry.keys()) == {'example', 'index'}
 
+
 def test_template_chain():
     tpl1 = Templates().register_path('./templates')
     tpl2 = Templates().register_package_resources('knappe.fixtures:templates')
@@ -39,4 +48,199 @@ def test_template_chain():
     chain.register(tpl1, 2)
     chain.register(tpl2, 1)
     assert list(chain) == [(1, tpl2), (2, tpl1)]
-    assert chain.get('index') is tpl2['index']
\ No newline at end of file
+    assert chain.get('index') is tpl2['index']
+
+
+def test_no_disk_cache_by_default():
+    templates = Templates().register_path('./templates')
+    assert templates.cache_directory is None
+    assert templates.loader is None
+    assert not isinstance(templates['test'].loader, TemplateCache)
+
+
+def test_warmup(tmp_path):
+    cache = tmp_path / 'cache'
+    cache.mkdir()
+    templates = Templates(cache_directory=cache).register_path('./templates')
+    timings = templates.warmup()
+    assert set(timings) == {'test', 'index'}
+    assert all(timing >= 0 for timing in timings.values())
+    assert set(templates.cache) == {'test', 'index'}
+    assert [p for p in cache.iterdir() if p.suffix == '.py']
+
+
+def test_warmup_processes(tmp_path):
+    cache = tmp_path / 'cache'
+    cache.mkdir()
+    templates = Templates(cache_directory=cache).register_path('./templates')
+    timings = templates.warmup(processes=2)
+    assert set(timings) == {'test', 'index'}
+    compiled = {p.name for p in cache.iterdir() if p.suffix == '.py'}
+    assert len(compiled) == 2
+
+    # The workers' compiled modules are reused by the others.
+    templates = Templates(cache_directory=cache).register_path('./templates')
+    templates.warmup()
+    assert {p.name for p in cache.iterdir() if p.suffix == '.py'} == compiled
+    assert templates['test'].render().strip() == 'test'
+
+
+def test_template_cache(tmp_path):
+    cache = tmp_path / 'cache'
+    templates = Templates(cache_directory=cache).register_path('./templates')
+    templates.warmup()
+    modules = {p.name for p in cache.glob('*.py')}
+    assert len(modules) == 2
+
+    # Same content, same expression types: the modules are reused.
+    other = Templates(cache_directory=cache).register_path('./templates')
+    assert isinstance(other.loader, TemplateCache)
+    other.warmup()
+    assert {p.name for p in cache.glob('*.py')} == modules
+
+    # Other expression types: compiled apart.
+    other.loader.expression_types = {'custom': TemplateCache}
+    other.invalidate()
+    other['test'].cook_check()
+    assert len(set(cache.glob('*.py'))) == 3
+
+    # Pruning, least recently used first.
+    loader = other.loader
+    sizes = sorted(size for _, size, _ in loader.entries())
+    freed = loader.prune(sum(sizes) - 1)
+    assert freed > 0
+    assert len(set(cache.glob('*.py'))) == 2
+    loader.prune(0)
+    assert not set(cache.glob('*.py'))
+    assert not set(cache.glob('__pycache__/*.pyc'))
+
+
+def test_template_cache_content_addressed(tmp_path):
+    cache = tmp_path / 'cache'
+    for release in ('release-1', 'release-2'):
+        shutil.copytree(
+            Path(__file__).parent / 'templates', tmp_path / release)
+        Templates(cache_directory=cache).register_path(
+            tmp_path / release).warmup()
+        # The same sources in another directory reuse the modules.
+        assert len(set(cache.glob('*.py'))) == 2
+
+
+def test_template_cache_debug_paths(tmp_path):
+    cache = tmp_path / 'cache'
+    with patch.object(PageTemplateFile, 'debug', True):
+        for release in ('release-1', 'release-2'):
+            shutil.copytree(
+                Path(__file__).parent / 'templates', tmp_path / release)
+            Templates(cache_directory=cache).register_path(
+                tmp_path / release).warmup()
+    # In debug mode, each release has its own modules.
+    modules = set(cache.glob('*.py'))
+    assert len(modules) == 4
+    assert any(str(tmp_path / 'release-2') in module.read_text()
+               for module in modules)
+
+
+def test_single_flight_compilation():
+    templates = Templates().register_path('./templates')
+    load = templates.load
+
+    def slow_load(path):
+        time.sleep(0.05)
+        return load(path)
+
+    results = []
+    with patch.object(templates, 'load', side_effect=slow_load) as loader:
+        threads = [
+            threading.Thread(target=lambda: results.append(templates['test']))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert loader.call_count == 1
+    assert len(results) == 10
+    assert all(tpl is results[0] for tpl in results)
+
+
+def test_auto_reload(tmp_path):
+    source = tmp_path / 'page.pt'
+    source.write_text('<p>first</p>')
+    templates = Templates(reload_interval=60).register_path(tmp_path)
+    assert templates['page']().strip() == '<p>first</p>'
+    version = templates.version
+
+    source.write_text('<p>second</p>')
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    # Not yet checked: the interval did not elapse.
+    assert templates['page']().strip() == '<p>first</p>'
+    assert templates.refresh(force=True) == ['page']
+    assert templates.version == version + 1
+    assert templates['page']().strip() == '<p>second</p>'
+    assert templates.refresh(force=True) == []
+
+
+def test_no_reload(tmp_path):
+    source = tmp_path / 'page.pt'
+    source.write_text('<p>first</p>')
+    templates = Templates().register_path(tmp_path)
+    templates['page']
+    assert templates.entries['page'].mtime is None
+    source.write_text('<p>second</p>')
+    assert templates['page']().strip() == '<p>first</p>'
+
+
+def test_merge_shares_entries():
+    tpl1 = Templates().register_path('./templates')
+    tpl2 = Templates().register_package_resources(
+        'knappe.fixtures:templates')
+    merged = tpl1 | tpl2
+    assert merged['example'] is tpl2['example']
+    assert merged['test'] is tpl1['test']
+
+    # In place: the merged entries are added, nothing is copied.
+    version = tpl1.version
+    tpl1 |= tpl2
+    assert tpl1.version > version
+    assert set(tpl1) == {'test', 'index', 'example'}
+    assert tpl1.entries['index'] is tpl2.entries['index']
+    assert tpl1['example'] is merged['example']
+
+
+def test_read_only_views():
+    templates = Templates().register_path('./templates')
+    assert set(templates.registry) == {'test', 'index'}
+    assert dict(templates.cache) == {}
+    tpl = templates['test']
+    assert dict(templates.cache) == {'test': tpl}
+    with pytest.raises(TypeError):
+        templates.registry['other'] = templates.registry['test']
+    with pytest.raises(AttributeError):
+        templates.cache.clear()
+
+    version = templates.version
+    templates.invalidate()
+    assert dict(templates.cache) == {}
+    assert templates.version == version + 1
+    assert templates['test'] is not tpl
+
+
+def test_template_chain_index(tmp_path):
+    tpl1 = Templates().register_path('./templates')
+    tpl2 = Templates()
+    chain = TemplatesChain()
+    chain.register(tpl1, 2)
+    chain.register(tpl2, 1)
+    assert chain.get('test') is tpl1['test']
+    assert chain.get('page') is None
+
+    # The index follows the changes of the layers.
+    (tmp_path / 'test.pt').write_text('<p>override</p>')
+    (tmp_path / 'page.pt').write_text('<p>page</p>')
+    tpl2.register_path(tmp_path)
+    assert chain.get('test') is tpl2['test']
+    assert chain.get('page')().strip() == '<p>page</p>'